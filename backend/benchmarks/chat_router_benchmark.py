@@ -0,0 +1,103 @@
+"""
+chat_router_benchmark.py - /chat/ 언어/의도 판별 오버헤드 비교
+기존 방식(키워드별 부분 문자열 검사 + 매번 langdetect)과 컴파일된 ChatRouter(단일 정규식 + langdetect 캐시)의
+메시지당 처리 시간을 측정하고, 두 방식의 결과가 같은지 확인합니다
+
+사용법 (backend 디렉토리에서):
+    python -m benchmarks.chat_router_benchmark --repeat 2000
+"""
+
+import argparse
+import time
+
+from langdetect import detect
+
+import chatbot
+
+MESSAGES = [
+    "hello",
+    "Hi, how are you?",
+    "안녕하세요",
+    "이미지를 음악으로 변환해주세요",
+    "비디오를 업로드하면 음악을 만들어 주나요?",
+    "你好",
+    "请帮我把图片转换成音乐",
+    "Can I upload your app a video to make music?",
+    "convert my photo into music please",
+    "What formats do you support?",
+    "How long does processing take for a 3 minute clip?",
+    "Quelle est la meilleure musique pour un film?",
+    "지원하는 파일 형식이 뭐예요",
+    "这个服务是免费的吗",
+]
+
+
+def legacy_query_type(text):
+    text_lower = text.strip().lower()
+    greetings, conversion, new_conversion = chatbot.GREETINGS, chatbot.CONVERSION_PATTERNS, chatbot.NEW_CONVERSION_WORDS
+    if any(g in text_lower for words in greetings.values() for g in words) and \
+       not any(p in text_lower for words in conversion.values() for p in words):
+        return "greeting"
+    is_conversion = any(p in text_lower for words in conversion.values() for p in words) or \
+        any(w in text_lower for words in new_conversion.values() for w in words)
+    if ("음악" in text_lower or "music" in text_lower or "音乐" in text_lower) and is_conversion:
+        return "conversion"
+    return "other"
+
+
+def legacy_language(text):
+    if any(k in text for k in chatbot.CHINESE_KEYWORDS):
+        return "zh"
+    if any(k in text for k in chatbot.KOREAN_KEYWORDS):
+        return "ko"
+    try:
+        detected = detect(text)
+    except Exception:
+        return "en"
+    if detected.startswith("zh"):
+        return "zh"
+    elif detected.startswith("ko"):
+        return "ko"
+    return "en"
+
+
+def legacy_route(text):
+    return legacy_language(text), legacy_query_type(text)
+
+
+def per_message_us(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for message in MESSAGES:
+            fn(message)
+    return (time.perf_counter() - start) / (repeat * len(MESSAGES)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chat language/intent routing microbenchmark")
+    parser.add_argument("--repeat", type=int, default=2000)
+    args = parser.parse_args()
+
+    mismatches = [(m, legacy_route(m), tuple(chatbot.router.route(m))) for m in MESSAGES
+                  if legacy_route(m) != tuple(chatbot.router.route(m))]
+    for message, legacy, routed in mismatches:
+        print(f"[Bench] mismatch: {message!r} legacy={legacy} router={routed}")
+    print(f"[Bench] {len(MESSAGES)} messages, {len(mismatches)} mismatches")
+
+    # 기존 방식은 langdetect가 느리므로 반복 횟수를 줄여 측정
+    legacy_us = per_message_us(legacy_route, max(1, args.repeat // 100))
+    keyword_us = per_message_us(legacy_query_type, args.repeat)
+    router_intent_us = per_message_us(lambda m: chatbot.router.intent(chatbot.router.categories(m)), args.repeat)
+    router_us = per_message_us(chatbot.router.route, args.repeat)
+
+    print()
+    print(f"{'variant':<34}{'us/message':>12}")
+    print(f"{'legacy intent (substring scans)':<34}{keyword_us:>12.2f}")
+    print(f"{'router intent (compiled regex)':<34}{router_intent_us:>12.2f}")
+    print(f"{'legacy language + intent':<34}{legacy_us:>12.2f}")
+    print(f"{'router language + intent (cached)':<34}{router_us:>12.2f}")
+    print(f"speedup (language + intent): {legacy_us / router_us:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
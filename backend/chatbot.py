@@ -1,19 +1,18 @@
-from langchain_google_genai.chat_models import ChatGoogleGenerativeAI
-from langchain.chains import ConversationChain
-from langchain.memory import ConversationBufferMemory
-from langchain.prompts import PromptTemplate
+from __future__ import annotations
+
 import os
 from dotenv import load_dotenv
-import glob
-from langdetect import detect, LangDetectException, DetectorFactory
-from typing import Dict, Tuple
+from langdetect import DetectorFactory
+from typing import Dict, Iterator, Tuple, TYPE_CHECKING
+
+from logic.chat_router import ChatRouter, detect_cached
+from logic.line_limit import LineLimiter, limit_lines
+from logic.semantic_cache import get_response_cache
 
-# RAG 관련 임포트
-from langchain_community.document_loaders import TextLoader
-from langchain.text_splitter import CharacterTextSplitter
-from langchain_community.vectorstores import FAISS
-from langchain_google_genai.embeddings import GoogleGenerativeAIEmbeddings
-from langchain.chains import RetrievalQA
+# langchain 관련 모듈은 무거우므로 체인/벡터 저장소를 만들 때 가져온다 (서버 시작 시간 단축)
+if TYPE_CHECKING:
+    from langchain.prompts import PromptTemplate
+    from logic.chat_sessions import ChatSessionStore
 
 # 환경 변수 로드
 load_dotenv()
@@ -27,83 +26,71 @@ SUPPORTED_LANGS = ["ko", "en", "zh"]  # 지원 언어 목록
 
 # 지식 베이스 디렉토리 경로
 KNOWLEDGE_BASE_DIR = "knowledge_base"
+# 사용자 언어에 따른 시스템 메시지 (세션 프롬프트 템플릿에 한 번만 포함)
+SYSTEM_MESSAGES = {
+    "ko": "당신은 AURA의 AI 어시스턴트입니다. 이미지와 비디오를 음악으로 변환하는 서비스를 제공합니다. 2-3줄로 간단명료하게 답변해주세요.",
+    "en": "You are AURA's AI assistant that converts images and videos to music. Keep your responses brief and clear, within 2-3 lines.",
+    "zh": "你是AURA的AI助手，可以将图片和视频转换为音乐。请用2-3行简短的语言回答问题。"
+}
+
+# 지식 베이스 변경 감지 주기(초), 0이면 재시작 전까지 반영하지 않음
+KNOWLEDGE_RELOAD_SEC = float(os.getenv("KNOWLEDGE_RELOAD_SEC", "30"))
+
+# 인사말 패턴
+GREETINGS = {
+    "en": ["hi", "hello", "hey", "good morning", "good afternoon", "good evening"],
+    "zh": ["你好", "您好", "嗨", "早上好", "下午好", "晚上好"],
+    "ko": ["안녕", "안녕하세요", "좋은아침", "좋은오후", "좋은저녁"]
+}
+
+# 변환 요청 패턴
+CONVERSION_PATTERNS = {
+    "en": ["convert", "change", "transform", "upload"],
+    "zh": ["转换", "变成", "生成", "上传"],
+    "ko": ["변환", "바꾸", "만들", "업로드"]
+}
+
+# 새로운 변환 요청 키워드
+NEW_CONVERSION_WORDS = {
+    "ko": ["업로드하시면", "파일을", "이미지나", "비디오를"],
+    "en": ["upload your", "file to", "image or", "video to"],
+    "zh": ["上传您的", "文件来", "图片或", "视频来"]
+}
+
+# 음악 관련 키워드
+MUSIC_WORDS = ["음악", "music", "音乐"]
+
+# 언어 판별용 키워드 (중국어 우선)
+CHINESE_KEYWORDS = [
+    "中文", "回答", "请", "想要", "帮助",
+    "音乐", "视频", "图片", "转换"
+]
+KOREAN_KEYWORDS = [
+    "안녕", "음악", "비디오", "이미지", "변환",
+    "도와", "주세요", "해주세요"
+]
+
+# 위 키워드 표로 시작 시 한 번 컴파일하는 언어/의도 라우터
+router = ChatRouter(
+    {
+        "greeting": [w for words in GREETINGS.values() for w in words],
+        "conversion": [w for words in CONVERSION_PATTERNS.values() for w in words],
+        "new_conversion": [w for words in NEW_CONVERSION_WORDS.values() for w in words],
+        "music": MUSIC_WORDS,
+        "lang_zh": CHINESE_KEYWORDS,
+        "lang_ko": KOREAN_KEYWORDS,
+    },
+    lang_categories=[("lang_zh", "zh"), ("lang_ko", "ko")],
+)
 
 def get_query_type(text: str) -> str:
     """메시지 유형 확인"""
-    text_lower = text.strip().lower()
-    
-    # 인사말 패턴
-    greetings = {
-        "en": ["hi", "hello", "hey", "good morning", "good afternoon", "good evening"],
-        "zh": ["你好", "您好", "嗨", "早上好", "下午好", "晚上好"],
-        "ko": ["안녕", "안녕하세요", "좋은아침", "좋은오후", "좋은저녁"]
-    }
-    
-    # 변환 요청 패턴
-    conversion_patterns = {
-        "en": ["convert", "change", "transform", "upload"],
-        "zh": ["转换", "变成", "生成", "上传"],
-        "ko": ["변환", "바꾸", "만들", "업로드"]
-    }
-    
-    # 새로운 변환 요청 키워드
-    new_conversion_words = {
-        "ko": ["업로드하시면", "파일을", "이미지나", "비디오를"],
-        "en": ["upload your", "file to", "image or", "video to"],
-        "zh": ["上传您的", "文件来", "图片或", "视频来"]
-    }
-    
-    # 인사말만 있는 경우
-    if any(greeting in text_lower for greetings_list in greetings.values() for greeting in greetings_list) and \
-       not any(pattern in text_lower for patterns_list in conversion_patterns.values() for pattern in patterns_list):
-        return "greeting"
-    
-    # 변환 요청 확인 - 새로운 조건 추가
-    is_conversion = False
-    
-    # 기본 변환 패턴 확인
-    if any(pattern in text_lower for patterns_list in conversion_patterns.values() for pattern in patterns_list):
-        is_conversion = True
-    
-    # 새로운 변환 키워드 확인
-    if any(word in text_lower for words_list in new_conversion_words.values() for word in words_list):
-        is_conversion = True
-    
-    # 음악 관련 키워드가 있고 파일 업로드나 변환에 관한 내용이 있는 경우에만 변환으로 처리
-    if ("음악" in text_lower or "music" in text_lower or "音乐" in text_lower) and is_conversion:
-        return "conversion"
-    
-    return "other"
+    return router.intent(router.categories(text))
 
 def detect_language(text: str) -> str:
     """언어 감지 (한국어, 영어, 중국어 지원)"""
     try:
-        # 중국어 키워드 검색
-        chinese_keywords = [
-            "中文", "回答", "请", "想要", "帮助",
-            "音乐", "视频", "图片", "转换"
-        ]
-        if any(keyword in text for keyword in chinese_keywords):
-            return "zh"
-            
-        # 한국어 키워드 검색
-        korean_keywords = [
-            "안녕", "음악", "비디오", "이미지", "변환",
-            "도와", "주세요", "해주세요"
-        ]
-        if any(keyword in text for keyword in korean_keywords):
-            return "ko"
-            
-        # langdetect로 추가 검사
-        detected = detect(text)
-        if detected.startswith("zh"):
-            return "zh"
-        elif detected.startswith("ko"):
-            return "ko"
-        elif detected.startswith("en"):
-            return "en"
-            
-        return "en"  # 기본값을 영어로 변경
+        return router.language(text)
     except Exception as e:
         print(f"[ERROR] Language detection failed: {str(e)}")
         return "en"  # 예외 시 영어 기본값
@@ -149,8 +136,10 @@ def validate_translation(text: str, target_lang: str) -> str:
         if len(text.strip()) < 10:
             return text
             
-        # 언어 감지
-        detected = detect(text)
+        # 언어 감지 (캐시)
+        detected = detect_cached(text)
+        if detected is None:
+            return text
         print(f"[INFO] Detected response language: {detected}, target: {target_lang}")
         
         if detected == target_lang:
@@ -172,61 +161,28 @@ def validate_translation(text: str, target_lang: str) -> str:
         print(f"[ERROR] Translation validation failed: {str(e)}")
         return text
 
-def initialize_vector_store():
-    """벡터 저장소 초기화 (최적화된 청크 설정)"""
+def initialize_knowledge_store():
+    """
+    지식 베이스 저장소 초기화. 디스크에 저장된 인덱스의 manifest(파일 해시, 임베딩 모델)가
+    현재 지식 베이스와 같으면 재사용하고, 바뀐 파일만 다시 임베딩한다.
+    반환된 KnowledgeStore의 store가 현재 벡터 저장소 (문서가 없으면 None)
+    """
+    from langchain_google_genai.embeddings import GoogleGenerativeAIEmbeddings
+    from logic.knowledge_store import KnowledgeStore, EMBEDDING_MODEL
+
     try:
         if not os.path.exists(KNOWLEDGE_BASE_DIR):
             os.makedirs(KNOWLEDGE_BASE_DIR)
             print(f"[INFO] Created knowledge base directory: {KNOWLEDGE_BASE_DIR}")
-        
-        file_paths = glob.glob(f"{KNOWLEDGE_BASE_DIR}/*.txt")
-        print(f"[INFO] Found knowledge base files: {file_paths}")
-        
-        if not file_paths:
-            print("[WARNING] No text files found in knowledge base directory")
-            return None
-        
-        documents = []
-        for file_path in file_paths:
-            try:
-                loader = TextLoader(file_path, encoding='utf-8')
-                loaded_docs = loader.load()
-                documents.extend(loaded_docs)
-                print(f"[INFO] Loaded {len(loaded_docs)} documents from {file_path}")
-            except Exception as e:
-                print(f"[ERROR] Failed to load {file_path}: {str(e)}")
-                continue
-        
-        if not documents:
-            print("[WARNING] No valid documents loaded from knowledge base")
-            return None
-        
-        print(f"[INFO] Total documents loaded: {len(documents)}")
-        
-        # 최적화된 청크 설정
-        text_splitter = CharacterTextSplitter(
-            chunk_size=500,
-            chunk_overlap=100,
-            separator="\n",
-            length_function=len
+
+        embeddings = GoogleGenerativeAIEmbeddings(
+            google_api_key=GOOGLE_API_KEY, 
+            model=EMBEDDING_MODEL
         )
-        
-        try:
-            texts = text_splitter.split_documents(documents)
-            print(f"[INFO] Split into {len(texts)} text chunks")
-            
-            embeddings = GoogleGenerativeAIEmbeddings(
-                google_api_key=GOOGLE_API_KEY, 
-                model="models/embedding-001"
-            )
-            
-            vector_store = FAISS.from_documents(texts, embeddings)
+        knowledge_store = KnowledgeStore(KNOWLEDGE_BASE_DIR, embeddings=embeddings)
+        if knowledge_store.load_or_build():
             print("[INFO] Vector store initialized successfully")
-            return vector_store
-            
-        except Exception as e:
-            print(f"[ERROR] Failed to create vector store: {str(e)}")
-            return None
+        return knowledge_store
             
     except Exception as e:
         print(f"[ERROR] Vector store initialization failed: {str(e)}")
@@ -234,6 +190,8 @@ def initialize_vector_store():
 
 def create_prompt_template(detected_lang: str) -> PromptTemplate:
     """언어 중립적 프롬프트 템플릿"""
+    from langchain.prompts import PromptTemplate
+
     lang_map = {
         "ko": "한국어 (Korean)",
         "en": "English",
@@ -241,8 +199,9 @@ def create_prompt_template(detected_lang: str) -> PromptTemplate:
     }
     
     template = f"""SYSTEM: You are AURA - an AI assistant specializing in image/music conversion.
+{SYSTEM_MESSAGES.get(detected_lang, SYSTEM_MESSAGES["en"])}
 IMPORTANT INSTRUCTION:
-1. You MUST respond ONLY in {lang_map.get(detected_lang)}
+1. You MUST respond ONLY in {lang_map.get(detected_lang, lang_map["en"])}
 2. Maintain technical accuracy
 3. Reference uploaded media when present
 4. Be helpful and friendly
@@ -258,79 +217,90 @@ AURA:"""
         template=template
     )
 
-def get_chatbot() -> Tuple[ConversationChain, RetrievalQA]:
-    """채팅 모델 초기화"""
+class KnowledgeQA:
+    """
+    지식 기반 QA 체인 보관소. 지식 베이스가 갱신되면 retriever를 교체하고,
+    시작 시 문서가 없었으면 첫 문서가 반영될 때 체인을 만든다 (재시작 불필요)
+    """
+
+    def __init__(self, llm):
+        self.llm = llm
+        self.chain = None
+
+    def update(self, store):
+        from langchain.chains import RetrievalQA
+
+        if self.chain is None:
+            self.chain = RetrievalQA.from_chain_type(
+                llm=self.llm,
+                chain_type="stuff",
+                retriever=store.as_retriever(),
+                return_source_documents=True
+            )
+            print("[INFO] QA chain initialized with vector store")
+        else:
+            self.chain.retriever = store.as_retriever()
+            print("[INFO] QA chain retriever swapped to the updated knowledge index")
+
+    def __bool__(self):
+        return self.chain is not None
+
+def get_chatbot() -> Tuple[ChatSessionStore, KnowledgeQA]:
+    """채팅 모델 초기화. (세션별 대화 체인 저장소, QA 체인 보관소) 반환"""
+    from logic.chat_sessions import ChatSessionStore
+    from logic.gemini_llm import PooledGeminiLLM
+
     try:
         print("[INFO] Initializing chatbot...")
         
         if not GOOGLE_API_KEY:
             raise ValueError("GOOGLE_API_KEY is not set")
         
-        # 모델 초기화
-        llm = ChatGoogleGenerativeAI(
-            google_api_key=GOOGLE_API_KEY,
-            model="gemini-1.5-flash",
-            temperature=0.7,
-            convert_system_message_to_human=True
+        # 모델 초기화 (LLMPromptRefiner와 같은 공유 Gemini 클라이언트 사용: 연결 재사용, 호출 기한, hedge 요청)
+        llm = PooledGeminiLLM(
+            model_name="gemini-1.5-flash",
+            temperature=0.7
         )
         print("[INFO] LLM initialized successfully")
         
-        # 일반 대화용 체인
-        conversation = ConversationChain(
-            llm=llm,
-            memory=ConversationBufferMemory()
-        )
-        print("[INFO] Conversation chain initialized")
+        # 일반 대화용 체인 (세션별, 최근 몇 턴만 기억)
+        sessions = ChatSessionStore(llm, create_prompt_template)
+        print("[INFO] Conversation sessions initialized")
         
         # 지식 기반 QA 체인
-        vector_store = initialize_vector_store()
-        if vector_store:
-            qa_chain = RetrievalQA.from_chain_type(
-                llm=llm,
-                chain_type="stuff",
-                retriever=vector_store.as_retriever(),
-                return_source_documents=True
-            )
-            print("[INFO] QA chain initialized with vector store")
+        qa_chain = KnowledgeQA(llm)
+        knowledge_store = initialize_knowledge_store()
+        if knowledge_store and knowledge_store.store:
+            qa_chain.update(knowledge_store.store)
         else:
-            qa_chain = None
             print("[WARNING] QA chain initialization failed - no vector store")
+
+        # 지식 베이스 파일이 바뀌면 증분 반영 후 retriever를 통째로 교체 (문서가 없던 경우에도 감시)
+        if knowledge_store and KNOWLEDGE_RELOAD_SEC > 0:
+            knowledge_store.watch(KNOWLEDGE_RELOAD_SEC, qa_chain.update)
             
-        return conversation, qa_chain
+        return sessions, qa_chain
     except Exception as e:
         print(f"[ERROR] Failed to initialize chatbot: {str(e)}")
         # 기본 대화 체인 생성 (비트)
-        basic_llm = ChatGoogleGenerativeAI(
-            google_api_key=GOOGLE_API_KEY,
-            model="gemini-pro",
+        basic_llm = PooledGeminiLLM(
+            model_name="gemini-pro",
             temperature=0.7
         )
-        basic_conversation = ConversationChain(
-            llm=basic_llm,
-            memory=ConversationBufferMemory()
-        )
-        return basic_conversation, None
-    
-    return ConversationChain(
-        llm=llm,
-        memory=memory,
-        verbose=True
-    ), qa_chain
+        return ChatSessionStore(basic_llm, create_prompt_template), None
 
 def process_message(
-    conversation: ConversationChain,
-    qa_chain: RetrievalQA,
+    sessions: ChatSessionStore,
+    qa_chain: KnowledgeQA,
     message: str,
+    session_id: str = "default",
     **media_urls
 ) -> str:
     """강화된 메시지 처리 파이프라인"""
     try:
-        # 언어 감지
-        detected_lang = detect_language(message)
+        # 언어 감지 + 쿼리 유형 판단 (한 번의 스캔)
+        detected_lang, query_type = router.route(message)
         print(f"[INFO] Detected language: {detected_lang}, Message: {message[:50]}...")
-        
-        # 쿼리 유형 판단
-        query_type = get_query_type(message)
         print(f"[INFO] Query type detected: {query_type}")
         
         # 인사말 처리
@@ -357,28 +327,43 @@ def process_message(
         else:
             print("[INFO] General query detected, using conversation chain")
             try:
-                # 사용자 언어에 따른 시스템 메시지
-                system_messages = {
-                    "ko": "당신은 AURA의 AI 어시스턴트입니다. 이미지와 비디오를 음악으로 변환하는 서비스를 제공합니다. 2-3줄로 간단명료하게 답변해주세요.",
-                    "en": "You are AURA's AI assistant that converts images and videos to music. Keep your responses brief and clear, within 2-3 lines.",
-                    "zh": "你是AURA的AI助手，可以将图片和视频转换为音乐。请用2-3行简短的语言回答问题。"
-                }
-                
-                # 시스템 메시지 설정
-                conversation.memory.chat_memory.add_user_message(system_messages.get(detected_lang, system_messages["en"]))
-                
-                # Gemini로 응답 생성
-                response = conversation.predict(input=message)
+                response_cache = get_response_cache()
+                with sessions.session(session_id, detected_lang) as conversation:
+                    # 의미 기반 캐시는 대화의 첫 질문에만 사용한다 ("왜요?", "더 알려줘" 같은 후속 질문은
+                    # 문맥에 따라 답이 달라지므로 다른 세션의 답을 재사용하거나 저장하면 안 된다)
+                    if sessions.has_history(conversation):
+                        response_cache = None
+
+                    # 비슷한 질문에 이미 답한 적이 있으면 LLM 호출 없이 캐시된 답변 사용
+                    cached_response = None
+                    if response_cache:
+                        try:
+                            cached_response = response_cache.lookup(message, detected_lang)
+                        except Exception as e:
+                            print(f"[WARNING] Semantic cache lookup failed: {str(e)}")
+
+                    if cached_response is not None:
+                        # 대화 흐름이 이어지도록 세션 기록에는 남긴다
+                        conversation.memory.save_context({"input": message}, {"response": cached_response})
+                        print(f"[INFO] Semantic cache hit")
+                        return cached_response
+
+                    # 세션별 대화 체인으로 Gemini 응답 생성 (시스템 메시지는 세션 프롬프트에 포함)
+                    response = conversation.predict(input=message)
                 print(f"[INFO] Generated response using conversation chain")
                 
                 # 응답 검증 및 번역
                 if response and len(response.strip()) > 0:
                     # 응답을 2-3줄로 제한
-                    lines = [line for line in response.strip().split('\n') if line.strip()]
-                    short_response = '\n'.join(lines[:3])
+                    short_response = limit_lines(response)
                     
                     validated_response = validate_translation(short_response, detected_lang)
                     if len(validated_response.strip()) > 0:
+                        if response_cache:
+                            try:
+                                response_cache.store(message, detected_lang, validated_response)
+                            except Exception as e:
+                                print(f"[WARNING] Semantic cache store failed: {str(e)}")
                         return validated_response
                         
                 print("[WARNING] Empty or invalid response from conversation chain")
@@ -393,6 +378,84 @@ def process_message(
         return get_fallback_response(detected_lang)
 
 
+def stream_message(
+    sessions: ChatSessionStore,
+    qa_chain: KnowledgeQA,
+    message: str,
+    session_id: str = "default"
+) -> Iterator[str]:
+    """
+    process_message의 스트리밍 버전. 응답 텍스트 조각을 생성되는 대로 yield 한다.
+    LLM 응답이 최대 줄 수(LineLimiter)에 도달하면 업스트림 스트림을 닫아 생성을 중단한다.
+    (이미 보낸 조각은 되돌릴 수 없으므로 validate_translation은 적용하지 않는다)
+    """
+    detected_lang, query_type = router.route(message)
+    if query_type != "other":
+        # 인사말/변환 안내는 LLM 호출이 없으므로 한 번에 보낸다
+        yield process_message(sessions, qa_chain, message, session_id)
+        return
+
+    parts = []
+    try:
+        # 세션 잠금은 프롬프트(시스템 메시지 + 최근 기록 스냅샷)를 만들 때만 잡는다.
+        # 스트리밍 중에 잠금을 쥐고 있으면 클라이언트가 끊긴 뒤 제너레이터가 정리될 때까지 세션이 막힌다
+        with sessions.session(session_id, detected_lang) as conversation:
+            llm = conversation.llm
+            prompt = conversation.prompt.format(input=message, **conversation.memory.load_memory_variables({}))
+            # 의미 기반 캐시는 대화의 첫 질문에만 사용 (후속 질문의 답은 문맥에 따라 달라진다)
+            response_cache = None if sessions.has_history(conversation) else get_response_cache()
+
+        cached_response = None
+        if response_cache:
+            try:
+                cached_response = response_cache.lookup(message, detected_lang)
+            except Exception as e:
+                print(f"[WARNING] Semantic cache lookup failed: {str(e)}")
+
+        if cached_response is not None:
+            with sessions.session(session_id, detected_lang) as conversation:
+                conversation.memory.save_context({"input": message}, {"response": cached_response})
+            print(f"[INFO] Semantic cache hit")
+            yield cached_response
+            return
+
+        # ConversationChain과 같은 프롬프트로 LLM을 직접 스트리밍 호출
+        limiter = LineLimiter()
+        stream = llm.stream(prompt)
+        try:
+            for chunk in stream:
+                # LLM은 문자열, 채팅 모델은 메시지 조각을 내보낸다
+                text = limiter.feed(getattr(chunk, "content", chunk))
+                if text:
+                    parts.append(text)
+                    yield text
+                if limiter.done:
+                    print(f"[INFO] Response line limit reached, stopping generation")
+                    break
+        finally:
+            # 스트림을 닫으면 업스트림 요청이 취소되어 나머지 토큰은 생성되지 않는다
+            stream.close()
+
+        response = "".join(parts)
+        if response.strip():
+            with sessions.session(session_id, detected_lang) as conversation:
+                conversation.memory.save_context({"input": message}, {"response": response})
+    except Exception as e:
+        print(f"[ERROR] Streaming conversation error: {str(e)}")
+        if not parts:
+            yield get_fallback_response(detected_lang)
+        return
+
+    if not parts:
+        print("[WARNING] Empty response from streaming conversation")
+        yield get_fallback_response(detected_lang)
+    elif response_cache:
+        try:
+            response_cache.store(message, detected_lang, "".join(parts))
+        except Exception as e:
+            print(f"[WARNING] Semantic cache store failed: {str(e)}")
+
+
 def get_fallback_response(lang: str) -> str:
     """언어별 안전망 응답"""
     fallback_responses = {
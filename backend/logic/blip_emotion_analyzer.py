@@ -1,32 +1,102 @@
-from transformers import BlipProcessor, BlipForConditionalGeneration
+import os
+import time
 import torch
 from collections import Counter
+from logic.model_registry import get_model_registry
+
+# 한 번에 BLIP에 넣을 프레임 수 (코어 수 / VRAM에 맞게 조정)
+DEFAULT_BATCH_SIZE = int(os.getenv("BLIP_BATCH_SIZE", "8"))
 
 class BLIPEmotionAnalyzer:
-    def __init__(self, device=None):
-        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
-        self.processor = BlipProcessor.from_pretrained("Salesforce/blip-image-captioning-base")
-        self.model = BlipForConditionalGeneration.from_pretrained("Salesforce/blip-image-captioning-base").to(self.device)
+    def __init__(self, device=None, registry=None, batch_size=None):
+        # 모델은 프로세스 전역 레지스트리에서 빌려온다 (요청마다 from_pretrained 하지 않음)
+        registry = registry or get_model_registry()
+        self.device = device or registry.device
+        self.processor, self.model = registry.get_blip(self.device)
+        self.batch_size = max(1, batch_size or DEFAULT_BATCH_SIZE)
+        # 마지막 캡셔닝 처리량 통계 (frames, seconds, frames_per_second)
+        self.last_stats = None
+
+    def _caption_batch(self, batch):
+        inputs = self.processor(images=batch, return_tensors="pt").to(self.device)
+        with torch.no_grad():
+            output = self.model.generate(**inputs, max_length=50)
+        decoded = self.processor.batch_decode(output, skip_special_tokens=True)
+        return [caption.strip() for caption in decoded]
 
-    def analyze_frames(self, frames):
+    def iter_captions(self, frames, batch_size=None):
         """
-        프레임 리스트를 받아, 각 프레임을 BLIP으로 문장으로 해석한다.
-        가장 많이 등장한 대표 문장을 반환한다.
+        프레임 이터러블(리스트 또는 FrameExtractor.stream_frames 제너레이터)을
+        batch_size 단위로 묶어 캡션을 순서대로 yield 한다.
+        한 번에 최대 한 배치의 프레임만 보유하므로 영상 길이와 관계없이 메모리가 일정하다.
         """
-        captions = []
+        batch_size = max(1, batch_size or self.batch_size)
+        batch = []
 
         for frame in frames:
-            inputs = self.processor(images=frame, return_tensors="pt").to(self.device)
-            with torch.no_grad():
-                output = self.model.generate(**inputs, max_length=50)
-                caption = self.processor.decode(output[0], skip_special_tokens=True)
-                captions.append(caption.strip())
+            batch.append(frame)
+            if len(batch) >= batch_size:
+                yield from self._caption_batch(batch)
+                batch = []
+
+        if batch:
+            yield from self._caption_batch(batch)
+
+    def caption_frames(self, frames, batch_size=None):
+        """
+        프레임들을 batch_size 단위로 묶어 BLIP으로 캡셔닝한다.
+        입력 순서대로 캡션 리스트를 반환하고, 처리량을 self.last_stats에 기록한다.
+        """
+        batch_size = max(1, batch_size or self.batch_size)
+
+        start = time.perf_counter()
+        captions = list(self.iter_captions(frames, batch_size))
+        elapsed = time.perf_counter() - start
+
+        self.last_stats = {
+            "frames": len(captions),
+            "batch_size": batch_size,
+            "seconds": elapsed,
+            "frames_per_second": len(captions) / elapsed if elapsed > 0 else 0.0,
+        }
+        print(
+            f"[BLIP] {len(captions)} frames captioned in {elapsed:.2f}s "
+            f"(batch_size={batch_size}, {self.last_stats['frames_per_second']:.2f} frames/s)"
+        )
+        return captions
 
-        # 다수결 방식으로 가장 자주 등장한 문장 뽑기
+    @staticmethod
+    def _vote(captions, weights):
+        # 다수결 방식으로 가장 자주 등장한 문장 뽑기 (가중치 = 대표하는 프레임 수)
         if not captions:
             raise ValueError("프레임에서 문장을 생성할 수 없습니다.")
 
-        counter = Counter(captions)
+        counter = Counter()
+        for caption, weight in zip(captions, weights):
+            counter[caption] += weight
         top_caption = counter.most_common(1)[0][0]
 
         return top_caption
+
+    def analyze_frames(self, frames, batch_size=None):
+        """
+        프레임 리스트(또는 스트리밍 제너레이터)를 받아, 각 프레임을 BLIP으로 문장으로 해석한다.
+        가장 많이 등장한 대표 문장을 반환한다.
+        """
+        captions = self.caption_frames(frames, batch_size)
+        return self._vote(captions, [1] * len(captions))
+
+    def analyze_weighted_frames(self, weighted_frames, batch_size=None):
+        """
+        (frame, weight) 쌍(FrameDeduplicator.filter 출력)을 받아 중복이 제거된 프레임만 캡셔닝하고,
+        각 프레임의 가중치를 다수결에 반영한 대표 문장을 반환한다.
+        """
+        weights = []
+
+        def frames():
+            for frame, weight in weighted_frames:
+                weights.append(weight)
+                yield frame
+
+        captions = self.caption_frames(frames(), batch_size)
+        return self._vote(captions, weights)
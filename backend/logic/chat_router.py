@@ -0,0 +1,81 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+from langdetect import detect, LangDetectException
+
+Route = namedtuple("Route", ["lang", "intent"])
+
+
+@lru_cache(maxsize=4096)
+def detect_cached(text: str):
+    """langdetect 결과 캐시 (감지 실패 시 None). DetectorFactory.seed가 고정되어 있어야 결과가 결정적이다"""
+    try:
+        return detect(text)
+    except LangDetectException:
+        return None
+
+
+class ChatRouter:
+    """
+    채팅 메시지의 언어와 의도(greeting / conversion / other)를 한 번의 스캔으로 판별하는 라우터.
+    키워드 표(카테고리 → 키워드 목록)로부터 시작 시 하나의 정규식을 컴파일해 두고,
+    메시지마다 모든 위치에서 가장 긴 키워드를 찾는다(lookahead). 짧은 키워드가 긴 키워드 안에
+    포함되는 경우는 미리 계산해 둔 카테고리 집합으로 처리하므로, 키워드마다 `in` 검사를 하던
+    기존 로직과 같은 결과를 낸다.
+    """
+
+    def __init__(self, keyword_tables, lang_categories):
+        """
+        keyword_tables: 카테고리 → 키워드 목록 (예: {"greeting": [...], "lang_ko": [...]})
+        lang_categories: 우선순위 순 (카테고리, 언어 코드) 목록 (예: [("lang_zh", "zh"), ("lang_ko", "ko")])
+        """
+        self.lang_categories = lang_categories
+
+        categories = {}
+        for category, keywords in keyword_tables.items():
+            for keyword in keywords:
+                categories.setdefault(keyword.lower(), set()).add(category)
+
+        # 긴 키워드가 매칭되면 그 안에 포함된 짧은 키워드의 카테고리도 함께 매칭된 것으로 본다
+        self._categories = {
+            keyword: frozenset().union(*(cats for other, cats in categories.items() if other in keyword))
+            for keyword in categories
+        }
+        alternation = "|".join(re.escape(k) for k in sorted(categories, key=len, reverse=True))
+        self._pattern = re.compile(f"(?=({alternation}))")
+
+    def categories(self, text: str):
+        """메시지에 등장하는 키워드 카테고리 집합"""
+        found = set()
+        for match in self._pattern.finditer(text.strip().lower()):
+            found |= self._categories[match.group(1)]
+        return found
+
+    @staticmethod
+    def intent(found):
+        # 인사말만 있는 경우
+        if "greeting" in found and "conversion" not in found:
+            return "greeting"
+        # 음악 관련 키워드가 있고 파일 업로드나 변환에 관한 내용이 있는 경우에만 변환으로 처리
+        if "music" in found and ("conversion" in found or "new_conversion" in found):
+            return "conversion"
+        return "other"
+
+    def language(self, text: str, found=None) -> str:
+        """언어 감지 (한국어, 영어, 중국어 지원). 키워드로 정해지지 않으면 langdetect(캐시) 사용"""
+        found = self.categories(text) if found is None else found
+        for category, lang in self.lang_categories:
+            if category in found:
+                return lang
+
+        detected = detect_cached(text) or ""
+        if detected.startswith("zh"):
+            return "zh"
+        elif detected.startswith("ko"):
+            return "ko"
+        return "en"  # 기본값을 영어로 변경
+
+    def route(self, text: str) -> Route:
+        """(언어, 의도)"""
+        found = self.categories(text)
+        return Route(self.language(text, found), self.intent(found))
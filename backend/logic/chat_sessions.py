@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+class _Session:
+    def __init__(self, chain, lang):
+        self.chain = chain
+        self.lang = lang
+        self.lock = threading.Lock()
+        self.last_used = time.monotonic()
+
+
+class ChatSessionStore:
+    """
+    세션 ID별 대화 체인 저장소.
+    세션마다 최근 window_turns 턴만 기억하는 ConversationChain을 두고, 시스템 프롬프트는 세션 생성 시
+    프롬프트 템플릿에 한 번 넣는다 (대화 기록에 매 턴 추가하지 않으므로 프롬프트 길이가 일정하다).
+    세션 수가 max_sessions를 넘거나 idle_ttl_sec 동안 쓰이지 않은 세션은 LRU 순서로 제거한다.
+    """
+
+    def __init__(self, llm, prompt_factory=None, max_sessions=None, window_turns=None, idle_ttl_sec=None):
+        self.llm = llm
+        # 언어 코드 → PromptTemplate (history, input 변수 포함)
+        self.prompt_factory = prompt_factory
+        self.max_sessions = max_sessions or int(os.getenv("CHAT_MAX_SESSIONS", "1000"))
+        self.window_turns = window_turns or int(os.getenv("CHAT_MEMORY_TURNS", "6"))
+        self.idle_ttl_sec = idle_ttl_sec or float(os.getenv("CHAT_SESSION_TTL_SEC", "1800"))
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self._evicted = 0
+
+    def _create_chain(self, lang):
+        from langchain.chains import ConversationChain
+        from langchain.memory import ConversationBufferWindowMemory
+
+        kwargs = {"llm": self.llm, "memory": ConversationBufferWindowMemory(k=self.window_turns)}
+        if self.prompt_factory is not None:
+            kwargs["prompt"] = self.prompt_factory(lang)
+        return ConversationChain(**kwargs)
+
+    def _evict(self, now):
+        # 오래 쓰이지 않은 세션부터 (OrderedDict 앞쪽이 가장 오래전에 사용된 세션)
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if len(self._sessions) <= self.max_sessions and now - session.last_used < self.idle_ttl_sec:
+                break
+            del self._sessions[session_id]
+            self._evicted += 1
+
+    @contextmanager
+    def session(self, session_id, lang):
+        """
+        세션의 ConversationChain을 빌려준다 (없으면 생성, 언어가 바뀌었으면 프롬프트만 교체).
+        같은 세션의 동시 요청은 세션 잠금으로 순서대로 처리된다.
+        """
+        now = time.monotonic()
+        with self._lock:
+            session = self._sessions.get(session_id)
+            if session is None:
+                session = _Session(self._create_chain(lang), lang)
+                self._sessions[session_id] = session
+            else:
+                self._sessions.move_to_end(session_id)
+            session.last_used = now
+            self._evict(now)
+
+        with session.lock:
+            if session.lang != lang and self.prompt_factory is not None:
+                session.chain.prompt = self.prompt_factory(lang)
+                session.lang = lang
+            yield session.chain
+            session.last_used = time.monotonic()
+
+    @staticmethod
+    def has_history(chain):
+        """세션에 이전 대화가 있는지 (있으면 같은 질문이라도 문맥에 따라 답이 달라진다)"""
+        return bool(chain.memory.chat_memory.messages)
+
+    def reset(self, session_id):
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "window_turns": self.window_turns,
+                "evicted": self._evicted,
+            }
@@ -0,0 +1,137 @@
+import os
+import re
+from email.utils import formatdate, parsedate_to_datetime
+
+import anyio
+from fastapi import Request
+from fastapi.responses import FileResponse, Response
+
+# zero-copy 전송을 지원하지 않는 서버에서 범위 응답을 보낼 때의 읽기 단위
+RANGE_CHUNK_SIZE = 256 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class RangeFileResponse(Response):
+    """
+    파일의 [start, end] 구간만 보내는 206 응답.
+    ASGI 서버가 http.response.zerocopysend 확장을 지원하면 sendfile로 커널에서 바로 전송하고,
+    그렇지 않으면 청크 단위로 읽어 보낸다.
+    """
+
+    def __init__(self, path, start, end, size, headers, media_type):
+        super().__init__(status_code=206, headers=headers, media_type=media_type)
+        self.path = path
+        self.start = start
+        self.length = end - start + 1
+        self.headers["content-range"] = f"bytes {start}-{end}/{size}"
+        self.headers["content-length"] = str(self.length)
+
+    async def __call__(self, scope, receive, send):
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope.get("method", "GET").upper() == "HEAD":
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if "http.response.zerocopysend" in scope.get("extensions", {}):
+            with open(self.path, "rb") as f:
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": f.fileno(),
+                    "offset": self.start,
+                    "count": self.length,
+                    "more_body": False,
+                })
+            return
+
+        async with await anyio.open_file(self.path, "rb") as f:
+            await f.seek(self.start)
+            remaining = self.length
+            while remaining > 0:
+                chunk = await f.read(min(RANGE_CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+            if remaining > 0:
+                await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+
+def _parse_range(range_header, size):
+    """단일 bytes 범위만 지원. (start, end), 만족 불가 시 'unsatisfiable', 무시할 경우 None"""
+    match = _RANGE_RE.match(range_header.strip())
+    if not match:
+        # 다중 범위 등 지원하지 않는 형식은 무시하고 전체 응답 (RFC 9110 허용)
+        return None
+
+    first, last = match.groups()
+    if first == "" and last == "":
+        return None
+    if first == "":
+        # suffix 범위: 마지막 N 바이트
+        length = int(last)
+        if length == 0:
+            return "unsatisfiable"
+        return max(0, size - length), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return "unsatisfiable"
+    return start, min(end, size - 1)
+
+
+def _not_modified(request, etag, mtime):
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _if_range_matches(request, etag, last_modified):
+    if_range = request.headers.get("if-range")
+    return if_range is None or if_range.strip() in (etag, last_modified)
+
+
+def file_response(request: Request, path, media_type, filename=None, headers=None) -> Response:
+    """
+    결과 파일 응답. ETag/Last-Modified 조건부 요청(304)과 Range 요청(206/416)을 지원한다.
+    파일은 메모리로 읽지 않고 디스크에서 바로 전송한다.
+    """
+    stat = os.stat(path)
+    etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+    last_modified = formatdate(stat.st_mtime, usegmt=True)
+
+    base_headers = {
+        "accept-ranges": "bytes",
+        "etag": etag,
+        "last-modified": last_modified,
+    }
+    if filename:
+        base_headers["content-disposition"] = f"attachment; filename={filename}"
+    base_headers.update(headers or {})
+
+    if _not_modified(request, etag, stat.st_mtime):
+        return Response(status_code=304, headers=base_headers)
+
+    range_header = request.headers.get("range")
+    if range_header and _if_range_matches(request, etag, last_modified):
+        byte_range = _parse_range(range_header, stat.st_size)
+        if byte_range == "unsatisfiable":
+            return Response(
+                status_code=416,
+                headers={**base_headers, "content-range": f"bytes */{stat.st_size}"},
+            )
+        if byte_range is not None:
+            start, end = byte_range
+            return RangeFileResponse(path, start, end, stat.st_size, base_headers, media_type)
+
+    return FileResponse(path, media_type=media_type, headers=base_headers, stat_result=stat)
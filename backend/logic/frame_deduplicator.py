@@ -0,0 +1,55 @@
+import numpy as np
+from PIL import Image
+
+class FrameDeduplicator:
+    def __init__(self, hash_size=8, max_distance=5):
+        """
+        hash_size: dHash 한 변의 크기 (hash_size * hash_size 비트 해시)
+        max_distance: 마지막으로 유지한 프레임과의 해밍 거리가 이 값 이하이면 중복으로 간주
+        """
+        self.hash_size = hash_size
+        self.max_distance = max_distance
+        # 마지막 필터링 통계 (total, kept)
+        self.last_stats = None
+
+    def dhash(self, image):
+        """
+        축소한 흑백 이미지에서 인접 픽셀 밝기 차이로 만든 지각 해시 (bool 배열)
+        """
+        small = image.resize(
+            (self.hash_size + 1, self.hash_size), Image.BILINEAR, reducing_gap=2.0
+        ).convert("L")
+        pixels = np.asarray(small, dtype=np.int16)
+        return (pixels[:, 1:] > pixels[:, :-1]).ravel()
+
+    def filter(self, frames):
+        """
+        프레임 이터러블을 받아 장면이 바뀐 프레임만 (frame, weight) 쌍으로 yield 한다.
+        weight는 해당 프레임이 대표하는 (자신 포함) 연속 중복 프레임 수이며,
+        다음 장면이 시작되거나 입력이 끝날 때 확정되므로 한 장면만큼 늦게 yield 된다.
+        """
+        kept_frame = None
+        kept_hash = None
+        weight = 0
+        total = 0
+        kept = 0
+
+        for frame in frames:
+            total += 1
+            frame_hash = self.dhash(frame)
+
+            if kept_hash is not None and np.count_nonzero(frame_hash != kept_hash) <= self.max_distance:
+                weight += 1
+                continue
+
+            if kept_frame is not None:
+                yield kept_frame, weight
+
+            kept_frame, kept_hash, weight = frame, frame_hash, 1
+            kept += 1
+
+        if kept_frame is not None:
+            yield kept_frame, weight
+
+        self.last_stats = {"total": total, "kept": kept}
+        print(f"[Dedup] {kept}/{total} frames kept after near-duplicate elimination")
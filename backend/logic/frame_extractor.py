@@ -1,27 +1,113 @@
 import cv2
+import queue
+import threading
 from PIL import Image
 import numpy as np
 
+# fps 메타데이터가 없거나 잘못된 경우 사용할 기본값
+FALLBACK_FPS = 25.0
+# 다음 목표 프레임까지 이 프레임 수보다 멀면 grab() 대신 seek 사용
+SEEK_THRESHOLD_FRAMES = 30
+# stream_frames에서 디코딩 스레드와 추론 사이에 대기할 수 있는 최대 프레임 수
+DEFAULT_QUEUE_SIZE = 16
+# 스트림 종료 표시
+_END = object()
+
 class FrameExtractor:
-    def __init__(self, interval_sec=1):
+    def __init__(self, interval_sec=1, max_frames=None, use_seek=True):
         """
         interval_sec: 몇 초마다 프레임을 추출할지 (기본 1초)
+        max_frames: 지정하면 영상 길이와 관계없이 N개의 프레임을 균등 간격으로 추출
+        use_seek: True면 grab()/seek로 목표 프레임만 디코딩, False면 모든 프레임을 read()
         """
         self.interval_sec = interval_sec
+        self.max_frames = max_frames
+        self.use_seek = use_seek
+        # 마지막으로 처리한 비디오 정보 (fps, frame_count, duration, codec, width, height)
+        self.video_info = None
 
-    def extract_frames(self, video_path):
+    @staticmethod
+    def _read_info(cap):
+        fps = cap.get(cv2.CAP_PROP_FPS)
+        if not fps or fps <= 0 or np.isnan(fps):
+            print(f"[WARNING] 유효하지 않은 FPS({fps}), 기본값 {FALLBACK_FPS} 사용")
+            fps = FALLBACK_FPS
+
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        frame_count = max(frame_count, 0)
+
+        # FOURCC 정수를 4글자 코덱 이름으로 변환 (예: 'avc1')
+        fourcc = int(cap.get(cv2.CAP_PROP_FOURCC))
+        codec = "".join(chr((fourcc >> (8 * i)) & 0xFF) for i in range(4)).strip("\x00 ") if fourcc else None
+
+        return {
+            "fps": fps,
+            "frame_count": frame_count,
+            "duration": frame_count / fps if frame_count else 0.0,
+            "codec": codec or None,
+            "width": int(cap.get(cv2.CAP_PROP_FRAME_WIDTH)),
+            "height": int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT)),
+        }
+
+    def probe(self, video_path):
         """
-        비디오에서 일정 간격으로 프레임 추출 (PIL.Image 리스트 반환)
+        프레임을 디코딩하지 않고 비디오 메타데이터만 읽는다.
         """
         cap = cv2.VideoCapture(video_path)
-
         if not cap.isOpened():
             raise IOError(f"비디오를 열 수 없습니다: {video_path}")
+        try:
+            return self._read_info(cap)
+        finally:
+            cap.release()
 
-        fps = cap.get(cv2.CAP_PROP_FPS)
-        interval_frames = int(fps * self.interval_sec)
+    def _interval_frames(self, fps):
+        # fps가 1 미만이어도 0이 되지 않도록 최소 1프레임 간격 보장
+        return max(1, int(round(fps * self.interval_sec)))
 
-        frames = []
+    def target_indices(self, info):
+        """
+        추출할 프레임 인덱스 목록. max_frames가 있으면 구간 중앙에 균등 분포시킨다.
+        """
+        frame_count = info["frame_count"]
+        if frame_count <= 0:
+            return []
+
+        if self.max_frames:
+            n = min(self.max_frames, frame_count)
+            return sorted({int((i + 0.5) * frame_count / n) for i in range(n)})
+
+        return list(range(0, frame_count, self._interval_frames(info["fps"])))
+
+    @staticmethod
+    def _to_pil(frame):
+        # BGR(OpenCV) -> RGB(PIL)
+        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        return Image.fromarray(frame_rgb)
+
+    def _iter_by_seek(self, cap, indices):
+        position = 0
+
+        for target in indices:
+            if target - position > SEEK_THRESHOLD_FRAMES:
+                # 멀리 떨어진 프레임은 seek (키프레임부터 필요한 만큼만 디코딩)
+                cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+                position = target
+            else:
+                # 가까운 프레임은 grab()으로 건너뛰기 (색변환/복사 없음)
+                while position < target:
+                    if not cap.grab():
+                        return
+                    position += 1
+
+            ret, frame = cap.read()
+            if not ret:
+                return
+            position += 1
+            yield self._to_pil(frame)
+
+    def _iter_sequential(self, cap, info):
+        interval_frames = self._interval_frames(info["fps"])
         frame_idx = 0
 
         while True:
@@ -30,12 +116,94 @@ class FrameExtractor:
                 break
 
             if frame_idx % interval_frames == 0:
-                # BGR(OpenCV) -> RGB(PIL)
-                frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-                pil_image = Image.fromarray(frame_rgb)
-                frames.append(pil_image)
+                yield self._to_pil(frame)
 
             frame_idx += 1
 
-        cap.release()
+        # 프레임 수 메타데이터가 없는 컨테이너는 실제 읽은 프레임 수로 보정
+        if not info["frame_count"]:
+            info["frame_count"] = frame_idx
+            info["duration"] = frame_idx / info["fps"]
+
+    def iter_frames(self, video_path):
+        """
+        프레임을 하나씩 디코딩해 PIL.Image로 yield 하는 제너레이터.
+        전체 프레임을 메모리에 올리지 않으며, 열자마자 self.video_info를 기록한다.
+        """
+        cap = cv2.VideoCapture(video_path)
+
+        if not cap.isOpened():
+            raise IOError(f"비디오를 열 수 없습니다: {video_path}")
+
+        try:
+            info = self._read_info(cap)
+            self.video_info = info
+
+            if self.use_seek and info["frame_count"] > 0:
+                yield from self._iter_by_seek(cap, self.target_indices(info))
+            else:
+                yield from self._iter_sequential(cap, info)
+        finally:
+            cap.release()
+
+    def stream_frames(self, video_path, queue_size=DEFAULT_QUEUE_SIZE):
+        """
+        백그라운드 스레드에서 디코딩하고 크기 제한 큐를 통해 프레임을 yield 한다.
+        소비자(BLIP 추론)가 이전 배치를 처리하는 동안 다음 프레임을 미리 디코딩하며,
+        메모리에는 최대 queue_size개의 프레임만 대기한다.
+        """
+        frame_queue = queue.Queue(maxsize=max(1, queue_size))
+        stop = threading.Event()
+
+        def put(item):
+            # 소비자가 중단하면 블로킹된 put에서 빠져나올 수 있도록 주기적으로 확인
+            while not stop.is_set():
+                try:
+                    frame_queue.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def produce():
+            frames = self.iter_frames(video_path)
+            try:
+                for frame in frames:
+                    if not put((frame, None)):
+                        return
+            except Exception as e:
+                put((_END, e))
+                return
+            finally:
+                # 중단 시에도 VideoCapture를 즉시 해제
+                frames.close()
+            put((_END, None))
+
+        producer = threading.Thread(target=produce, name="frame-decoder", daemon=True)
+        producer.start()
+
+        try:
+            while True:
+                frame, error = frame_queue.get()
+                if frame is _END:
+                    if error is not None:
+                        raise error
+                    break
+                yield frame
+        finally:
+            stop.set()
+            producer.join()
+
+    def extract_frames(self, video_path):
+        """
+        비디오에서 일정 간격(또는 max_frames 예산)으로 프레임 추출 (PIL.Image 리스트 반환)
+        추출 후 self.video_info에 fps / frame_count / duration 등을 기록한다.
+        """
+        frames = list(self.iter_frames(video_path))
+
+        # 순차 디코딩 경로(프레임 수 미상)는 예산을 사후에 적용
+        if self.max_frames and len(frames) > self.max_frames:
+            picks = np.linspace(0, len(frames) - 1, self.max_frames).round().astype(int)
+            frames = [frames[i] for i in sorted(set(picks))]
+
         return frames
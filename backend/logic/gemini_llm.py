@@ -0,0 +1,66 @@
+from typing import Any, Iterator, List, Optional
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models.llms import LLM
+from langchain_core.outputs import GenerationChunk
+from logic.llm_client import get_llm_client
+
+
+class PooledGeminiLLM(LLM):
+    """
+    공유 GeminiClient를 사용하는 LangChain LLM.
+    ConversationChain 등 기존 체인에 그대로 넣을 수 있고, 호출 기한/hedge 요청/연결 재사용은 클라이언트가 처리한다.
+    """
+
+    model_name: str = "gemini-1.5-flash"
+    temperature: float = 0.7
+    deadline_sec: Optional[float] = None
+
+    @property
+    def _llm_type(self) -> str:
+        return "pooled-gemini"
+
+    @property
+    def _generation_config(self):
+        return {"temperature": self.temperature}
+
+    def _call(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        return get_llm_client().generate(
+            prompt, self.model_name, generation_config=self._generation_config, deadline_sec=self.deadline_sec
+        )
+
+    async def _acall(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> str:
+        return await get_llm_client().agenerate(
+            prompt, self.model_name, generation_config=self._generation_config, deadline_sec=self.deadline_sec
+        )
+
+    def _stream(
+        self,
+        prompt: str,
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any,
+    ) -> Iterator[GenerationChunk]:
+        chunks = get_llm_client().stream(
+            prompt, self.model_name, generation_config=self._generation_config, deadline_sec=self.deadline_sec
+        )
+        try:
+            for text in chunks:
+                chunk = GenerationChunk(text=text)
+                if run_manager:
+                    run_manager.on_llm_new_token(text, chunk=chunk)
+                yield chunk
+        finally:
+            # 소비자가 중간에 멈추면 업스트림 스트림도 취소
+            chunks.close()
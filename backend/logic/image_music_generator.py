@@ -1,38 +1,43 @@
-import torch
 from PIL import Image
 import pytesseract
-from transformers import BlipProcessor, BlipForConditionalGeneration
-from logic.llm_prompt_refiner import LLMPromptRefiner
-from logic.music_generator import MusicGenerator
+from logic.model_registry import get_model_registry
+from logic.music_batcher import get_music_scheduler
+from logic.inference_pool import get_inference_pool
 import uuid
 import os
 
+# 진행 상황 보고용 단계 이름 (generate_music_from_image의 progress 콜백에 순서대로 전달됨)
+IMAGE_MUSIC_STAGES = ["caption", "ocr", "refine_prompt", "generate_music"]
+# 이미지로 생성하는 음악 길이(초)
+IMAGE_MUSIC_DURATION = 10.0
+
 class ImageMusicGenerator:
-    def __init__(self, device=None):
-        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+    def __init__(self, device=None, registry=None):
+        self.registry = registry or get_model_registry()
+        self.device = device or self.registry.device
         print(f"[INFO] ImageMusicGenerator initialized with device: {self.device}")
         
-        # BLIP 모델 로드
+        # BLIP 모델 (레지스트리에서 공유)
         try:
-            self.processor = BlipProcessor.from_pretrained("Salesforce/blip-image-captioning-base")
-            self.model = BlipForConditionalGeneration.from_pretrained("Salesforce/blip-image-captioning-base").to(self.device)
-            print("[INFO] BLIP model loaded successfully")
+            self.processor, self.model = self.registry.get_blip(self.device)
+            print("[INFO] BLIP model ready")
         except Exception as e:
             print(f"[ERROR] Failed to load BLIP model: {e}")
             raise
 
-    def generate_music_from_image(self, image_path: str, output_dir: str) -> str:
+    def build_prompt(self, image_path: str, progress=None) -> str:
         """
-        이미지로부터 음악을 생성하고 저장 경로를 반환합니다.
+        이미지 캡셔닝 + OCR + 프롬프트 정제까지 수행해 MusicGen 프롬프트를 반환합니다.
         
         Args:
             image_path: 입력 이미지 경로
-            output_dir: 출력 음악 파일이 저장될 디렉토리
+            progress: 단계 진입 시 호출되는 콜백
             
         Returns:
-            생성된 음악 파일의 경로
+            MusicGen용 프롬프트 문장
         """
         print(f"[INFO] Processing image: {image_path}")
+        report = progress or (lambda stage: None)
         
         # 이미지 열기
         try:
@@ -43,7 +48,10 @@ class ImageMusicGenerator:
             raise
 
         # 1. 이미지 캡셔닝 (BLIP)
+        report("caption")
         try:
+            import torch
+
             inputs = self.processor(images=image, return_tensors="pt").to(self.device)
             with torch.no_grad():
                 output = self.model.generate(**inputs, max_length=50)
@@ -56,6 +64,7 @@ class ImageMusicGenerator:
             print(f"[INFO] Using default caption: {caption}")
 
         # 2. OCR 텍스트 추출
+        report("ocr")
         try:
             ocr_text = pytesseract.image_to_string(image, lang="eng+kor").strip()
             if ocr_text:
@@ -67,8 +76,9 @@ class ImageMusicGenerator:
             ocr_text = ""
 
         # 3. 프롬프트 생성
+        report("refine_prompt")
         try:
-            refiner = LLMPromptRefiner()
+            refiner = self.registry.get_refiner()
             if ocr_text:
                 prompt = refiner.refine_prompt(caption, [ocr_text])
             else:
@@ -80,22 +90,49 @@ class ImageMusicGenerator:
             prompt = f"Create music that captures the mood of: {caption}"
             print(f"[INFO] Using fallback prompt: {prompt}")
 
+        return prompt
+
+    def generate_music_from_image(self, image_path: str, output_dir: str, progress=None, output_path=None) -> str:
+        """
+        이미지로부터 음악을 생성하고 저장 경로를 반환합니다.
+        
+        Args:
+            image_path: 입력 이미지 경로
+            output_dir: 출력 음악 파일이 저장될 디렉토리
+            progress: 단계 진입 시 호출되는 콜백 (IMAGE_MUSIC_STAGES 순서)
+            output_path: 최종 저장 경로 (기본: output_dir/imagemusic_<uuid>.wav)
+            
+        Returns:
+            생성된 음악 파일의 경로
+        """
+        report = progress or (lambda stage: None)
+        # 추론 워커 풀이 켜져 있으면 캡셔닝~생성은 워커 프로세스에서 실행 (워커의 단계별 진입 시각은 끝난 뒤 보고)
+        pool = get_inference_pool()
+        if pool is not None:
+            report("caption")
+            prompt = pool.build_image_prompt(image_path, progress)
+        else:
+            prompt = self.build_prompt(image_path, report)
+
         # 4. 음악 생성
+        report("generate_music")
         try:
             # 출력 디렉토리 생성 (없는 경우)
             os.makedirs(output_dir, exist_ok=True)
             
             # 고유한 파일명 생성
-            output_path = os.path.join(output_dir, f"imagemusic_{uuid.uuid4()}.wav")
+            output_path = output_path or os.path.join(output_dir, f"imagemusic_{uuid.uuid4()}.wav")
+            partial_path = f"{output_path}.part"
             print(f"[INFO] Output music will be saved to: {output_path}")
             
-            # 음악 생성기 초기화 및 음악 생성
-            generator = MusicGenerator()
-            result = generator.generate_music(prompt, duration=10.0)
+            # 음악 생성 (동시 요청은 스케줄러가 하나의 배치로 묶어 생성)
+            generator = pool or get_music_scheduler()
+            result = generator.generate_music(prompt, duration=IMAGE_MUSIC_DURATION)
             
-            # 음악 파일 저장
+            # 음악 파일 저장 (임시 파일에 쓴 뒤 원자적으로 rename)
             from scipy.io import wavfile
-            wavfile.write(output_path, result['sampling_rate'], result['audio'])
+            wavfile.write(partial_path, result['sampling_rate'], result['audio'])
+            os.replace(partial_path, output_path)
             
             # 파일 존재 확인
             if os.path.exists(output_path):
@@ -0,0 +1,230 @@
+import gc
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from logic.model_registry import get_model_registry
+
+
+def _worker_init(num_threads, warmed, failed):
+    """
+    워커 프로세스 초기화: 코어를 워커 수로 나눠 intra-op 스레드 수를 제한하고,
+    모델마다 더미 추론을 1회 실행한 뒤 공유 카운터(warmed)를 올린다.
+    더미 추론이 실패하면 failed를 올리고 예외를 다시 던진다 (initializer 실패로 풀은 broken 상태가 된다).
+    """
+    import torch
+    from logic.warmup import warm_up_blip, warm_up_musicgen
+
+    torch.set_num_threads(num_threads)
+    registry = get_model_registry()
+    try:
+        warm_up_blip(registry)
+        warm_up_musicgen(registry)
+    except Exception as e:
+        print(f"[ERROR] InferencePool worker {os.getpid()} warmup failed: {e}")
+        with failed.get_lock():
+            failed.value += 1
+        raise
+    with warmed.get_lock():
+        warmed.value += 1
+    print(f"[InferencePool] worker {os.getpid()} ready (torch threads={num_threads})")
+
+
+def _ping():
+    return os.getpid()
+
+
+# 워커에서 실행되는 작업들. fork 시점에 부모가 로드해 둔 레지스트리 모델을 그대로(copy-on-write) 사용한다.
+
+def _caption_video_task(video_path):
+    from runner import caption_video
+
+    return caption_video(video_path)
+
+
+def _image_prompt_task(image_path):
+    from logic.image_music_generator import ImageMusicGenerator
+
+    # 워커에서는 작업의 진행 콜백을 부를 수 없으므로 단계별 진입 시각을 결과와 함께 돌려준다
+    stages = []
+    prompt = ImageMusicGenerator().build_prompt(image_path, lambda stage: stages.append((stage, time.time())))
+    return prompt, stages
+
+
+def _generate_music_task(prompt, duration):
+    from logic.music_generator import MusicGenerator
+
+    return MusicGenerator().generate_music(prompt, duration)
+
+
+class InferencePool:
+    """
+    모델 가중치를 공유하는 멀티 프로세스 추론 워커 풀.
+    부모(API) 프로세스에서 BLIP / MusicGen을 한 번 로드한 뒤 fork로 워커를 만들기 때문에,
+    가중치 텐서 페이지는 copy-on-write로 모든 워커가 공유하고 워커 수만큼 메모리가 늘지 않는다.
+    (추론은 가중치에 쓰지 않으므로 페이지가 복사되지 않는다)
+
+    fork는 CUDA 컨텍스트와 부모의 OpenMP 스레드 풀을 물려받지 못하므로 CPU 전용이며,
+    부모에서 추론을 한 번도 실행하기 전에 start()를 호출해야 한다.
+
+    워커가 죽거나 초기화에 실패해 풀이 broken 상태가 되면 healthy를 False로 바꾸고,
+    이후 작업(실패한 작업 포함)은 현재 프로세스에서 같은 함수를 직접 실행한다 (모델은 부모에 이미 로드되어 있다).
+    """
+
+    def __init__(self, num_workers=None, registry=None):
+        self.num_workers = num_workers or int(os.getenv("AURA_INFERENCE_WORKERS", "0"))
+        self.registry = registry or get_model_registry()
+        self._executor = None
+        self._warmed = None
+        self._failed = None
+        self.healthy = True
+
+    def start(self):
+        if self.registry.device != "cpu":
+            raise RuntimeError(f"InferencePool은 CPU 모델 전용입니다 (device: {self.registry.device})")
+
+        # 1. 부모에서 모델 로드 (워커들이 공유할 가중치)
+        self.registry.get_blip()
+        self.registry.get_musicgen()
+
+        # 2. 이후 GC가 기존 객체 헤더를 건드려 공유 페이지가 복사되지 않도록 현재 객체를 영구 세대로 이동
+        gc.freeze()
+        # fork 이후 HF tokenizers의 내부 스레드 풀 경고/교착 방지
+        os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+        threads = max(1, (os.cpu_count() or 1) // self.num_workers)
+        context = multiprocessing.get_context("fork")
+        self._warmed = context.Value("i", 0)
+        self._failed = context.Value("i", 0)
+        self._executor = ProcessPoolExecutor(
+            max_workers=self.num_workers,
+            mp_context=context,
+            initializer=_worker_init,
+            initargs=(threads, self._warmed, self._failed),
+        )
+
+        # 3. 다른 스레드가 생기기 전에 지금 워커를 모두 fork (fork 컨텍스트는 첫 submit 때 전부 생성)
+        # 워커 워밍업은 기다리지 않는다 (준비 상태는 warmed_workers()/wait_warmed()로 확인)
+        self._executor.submit(_ping).add_done_callback(self._check_broken)
+        print(f"[InferencePool] {self.num_workers} workers forked")
+        return self
+
+    def warmed_workers(self):
+        """더미 추론까지 마친 워커 수"""
+        return self._warmed.value if self._warmed is not None else 0
+
+    def failed_workers(self):
+        """더미 추론에 실패한 워커 수"""
+        return self._failed.value if self._failed is not None else 0
+
+    def wait_warmed(self, timeout=None, poll_sec=0.5):
+        """
+        모든 워커의 워밍업이 끝날 때까지 대기.
+        실패한 워커가 있거나 풀이 broken 상태면 RuntimeError, 시간 초과 시 TimeoutError
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.warmed_workers() < self.num_workers:
+            if self.failed_workers() or not self.healthy:
+                raise RuntimeError(
+                    f"Inference worker warmup failed ({self.failed_workers()}/{self.num_workers} workers failed)"
+                )
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"{self.warmed_workers()}/{self.num_workers} inference workers warmed up")
+            time.sleep(poll_sec)
+
+    def _check_broken(self, future):
+        if isinstance(future.exception(), BrokenProcessPool):
+            self.mark_unhealthy(future.exception())
+
+    def mark_unhealthy(self, error):
+        """이후 작업은 현재 프로세스에서 실행 (get_inference_pool()은 None을 반환)"""
+        if self.healthy:
+            self.healthy = False
+            # broken 풀의 워커 프로세스는 executor가 이미 정리한다
+            print(f"[ERROR] InferencePool broken, falling back to in-process inference: {error}")
+
+    def _run(self, fn, *args):
+        executor = self._executor
+        if self.healthy and executor is not None:
+            try:
+                return executor.submit(fn, *args).result()
+            except BrokenProcessPool as e:
+                self.mark_unhealthy(e)
+        # 풀을 쓸 수 없으면 현재 프로세스에서 같은 작업 실행
+        return fn(*args)
+
+    def caption_video(self, video_path):
+        """(raw_caption, video_info) 반환"""
+        return self._run(_caption_video_task, video_path)
+
+    def build_image_prompt(self, image_path, progress=None):
+        """
+        이미지 캡셔닝 + OCR + 프롬프트 정제 결과 반환.
+        progress: 끝난 뒤 워커의 단계별 진입 시각으로 progress(stage, at)를 호출 (단계별 소요 시간 기록용)
+        """
+        prompt, stages = self._run(_image_prompt_task, image_path)
+        if progress is not None:
+            for stage, at in stages:
+                progress(stage, at)
+        return prompt
+
+    def generate_music(self, prompt: str, duration: float):
+        """MusicGenerator.generate_music과 같은 형식의 결과 반환"""
+        return self._run(_generate_music_task, prompt, duration)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_pool = None
+_pool_lock = threading.Lock()
+# 풀 시작(모델 로드 + fork)이 예정되어 있으면 끝날 때까지 clear 상태
+_pool_settled = threading.Event()
+_pool_settled.set()
+
+
+def reserve_inference_pool():
+    """
+    start_inference_pool()을 곧 다른 스레드(백그라운드 워밍업)에서 호출할 것임을 표시한다.
+    그동안 get_inference_pool()은 시작이 끝날 때까지 기다린다: fork 전에 부모에서 추론이 실행되면
+    워커가 물려받은 OpenMP 스레드 풀이 망가지기 때문이다.
+    """
+    if int(os.getenv("AURA_INFERENCE_WORKERS", "0")) > 0:
+        _pool_settled.clear()
+
+
+def start_inference_pool(num_workers=None):
+    """AURA_INFERENCE_WORKERS > 0 이면 전역 워커 풀을 시작 (이미 시작했으면 그대로 반환)"""
+    global _pool
+    try:
+        with _pool_lock:
+            if _pool is None:
+                pool = InferencePool(num_workers)
+                if pool.num_workers <= 0:
+                    return None
+                _pool = pool.start()
+        return _pool
+    finally:
+        _pool_settled.set()
+
+
+def get_inference_pool():
+    """
+    시작된 전역 워커 풀. 비활성화되었거나 broken 상태면 None (호출자는 현재 프로세스에서 직접 추론).
+    풀 시작이 진행 중이면 끝날 때까지 기다리므로 작업 스레드에서만 호출한다.
+    """
+    _pool_settled.wait()
+    pool = _pool
+    return pool if pool is not None and pool.healthy else None
+
+
+def shutdown_inference_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
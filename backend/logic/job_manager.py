@@ -0,0 +1,224 @@
+import heapq
+import os
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+JOB_QUEUED = "queued"
+JOB_RUNNING = "running"
+JOB_SUCCEEDED = "succeeded"
+JOB_FAILED = "failed"
+
+
+class JobQueueFullError(RuntimeError):
+    """대기 중인 작업 수가 한도를 넘은 경우"""
+
+
+class Job:
+    def __init__(self, kind, stages, features=None, estimate=None):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.stages = list(stages)
+        # 처리 시간 추정/기록용 입력 특징과 단계별 예상 초
+        self.features = features
+        self.estimate = estimate
+        self.stage_started_at = {}
+        self.status = JOB_QUEUED
+        self.stage = None
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future = None
+
+    @property
+    def progress(self):
+        """완료된 단계 비율 (0.0 ~ 1.0)"""
+        if self.status == JOB_SUCCEEDED:
+            return 1.0
+        if not self.stages or self.stage not in self.stages:
+            return 0.0
+        return self.stages.index(self.stage) / len(self.stages)
+
+    def report(self, stage, at=None):
+        """
+        작업 함수가 단계 진입 시 호출하는 진행 상황 콜백.
+        at: 단계 진입 시각 (워커 프로세스에서 실행된 단계를 끝난 뒤 보고할 때)
+        """
+        self.stage = stage
+        self.stage_started_at[stage] = at or time.time()
+        print(f"[Job {self.id[:8]}] stage: {stage}")
+
+    def stage_seconds(self, end=None):
+        """
+        단계별 실제 소요 시간 (다음 단계 진입 또는 작업 종료까지).
+        작업 시작부터 첫 단계 진입까지의 준비 시간은 첫 단계에 포함한다.
+        보고되지 않은(건너뛴) 단계는 0초가 아니라 결과에서 빠지며, 학습에도 쓰이지 않는다
+        """
+        reported = sorted(self.stage_started_at.items(), key=lambda item: item[1])
+        if not reported:
+            return None
+        seconds = {}
+        end = end or self.finished_at or time.time()
+        for i, (stage, started_at) in enumerate(reported):
+            if i == 0:
+                started_at = self.started_at or started_at
+            until = reported[i + 1][1] if i + 1 < len(reported) else end
+            seconds[stage] = seconds.get(stage, 0.0) + max(0.0, until - started_at)
+        return seconds
+
+    def remaining_seconds(self, now=None):
+        """예상 남은 처리 시간 (대기 시간 제외). 추정치가 없으면 None"""
+        if self.estimate is None:
+            return None
+        if self.status in (JOB_SUCCEEDED, JOB_FAILED):
+            return 0.0
+        if self.status == JOB_QUEUED or self.stage not in self.stages:
+            return sum(self.estimate.values())
+
+        now = now or time.time()
+        index = self.stages.index(self.stage)
+        elapsed = now - self.stage_started_at[self.stage]
+        current = max(0.0, self.estimate.get(self.stage, 0.0) - elapsed)
+        return current + sum(self.estimate.get(stage, 0.0) for stage in self.stages[index + 1:])
+
+    def to_dict(self, queue_wait=0.0):
+        remaining = self.remaining_seconds()
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "stage": self.stage,
+            "stages": self.stages,
+            "progress": round(self.progress, 3),
+            "error": self.error,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            # 앞선 작업의 예상 남은 시간으로 계산한 대기 시간 + 이 작업의 예상 남은 시간
+            "eta_seconds": None if remaining is None else round(queue_wait + remaining, 1),
+        }
+
+
+class JobManager:
+    """
+    무거운 파이프라인(BLIP → Gemini → MusicGen → 합성)을 이벤트 루프 밖의 제한된 스레드풀에서 실행한다.
+    작업 함수는 첫 번째 인자로 진행 상황 콜백(report(stage))을 받고 결과를 반환한다.
+
+    estimator(ProcessingTimeEstimator)가 있으면 입력 특징(features)과 함께 제출된 작업의 단계별 예상 시간으로
+    ETA와 대기 시간을 계산하고, 새로 계산한(캐시 적중이 아닌) 작업이 끝나면 단계별 실제 소요 시간을 기록한다.
+    """
+
+    def __init__(self, max_workers=None, max_pending=32, max_history=1000, estimator=None, max_queue_wait_sec=None):
+        self.max_workers = max_workers or int(os.getenv("JOB_MAX_WORKERS", "2"))
+        self.max_pending = max_pending
+        self.estimator = estimator
+        # 예상 대기 시간이 이 값(초)을 넘으면 제출 거부 (0이면 작업 수 한도만 적용)
+        self.max_queue_wait_sec = max_queue_wait_sec or float(os.getenv("JOB_MAX_QUEUE_WAIT_SEC", "0"))
+        self.max_history = max_history
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="aura-job")
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+
+    def _active_count(self):
+        return sum(1 for job in self._jobs.values() if job.status in (JOB_QUEUED, JOB_RUNNING))
+
+    def _trim_history(self):
+        # 끝난 작업부터 오래된 순으로 정리
+        overflow = len(self._jobs) - self.max_history
+        for job_id in list(self._jobs):
+            if overflow <= 0:
+                break
+            if self._jobs[job_id].status in (JOB_SUCCEEDED, JOB_FAILED):
+                del self._jobs[job_id]
+                overflow -= 1
+
+    def _queue_wait(self, ahead, now):
+        """앞선 작업들이 워커를 차례로 점유한다고 보고 다음 작업이 시작될 때까지의 예상 시간 (초)"""
+        free_at = [0.0] * self.max_workers
+        for job in ahead:
+            if job.status in (JOB_QUEUED, JOB_RUNNING):
+                heapq.heappush(free_at, heapq.heappop(free_at) + (job.remaining_seconds(now) or 0.0))
+        return free_at[0]
+
+    def queue_wait_seconds(self):
+        """지금 제출하는 작업의 예상 대기 시간 (초)"""
+        with self._lock:
+            return self._queue_wait(list(self._jobs.values()), time.time())
+
+    def describe(self, job):
+        """작업 상태 + 대기 시간을 포함한 ETA"""
+        queue_wait = 0.0
+        if job.status == JOB_QUEUED:
+            with self._lock:
+                jobs = list(self._jobs.values())
+            ahead = jobs[:jobs.index(job)] if job in jobs else []
+            queue_wait = self._queue_wait(ahead, time.time())
+        return job.to_dict(queue_wait)
+
+    def _record(self, job):
+        # 캐시에서 바로 반환되었거나 중간에 취소된 작업은 파이프라인 전체를 거치지 않았으므로 기록하지 않는다
+        if self.estimator is None or job.features is None:
+            return
+        if isinstance(job.result, dict) and (job.result.get("cached") or job.result.get("cancelled")):
+            return
+        stage_seconds = job.stage_seconds(end=time.time())
+        if not stage_seconds:
+            return
+        try:
+            self.estimator.record(job.kind, job.features, stage_seconds)
+        except Exception as e:
+            print(f"[WARNING] Failed to record stage times for job {job.id}: {e}")
+
+    def submit(self, kind, stages, fn, *args, features=None, **kwargs):
+        """features: 처리 시간 추정/기록에 쓰는 입력 특징 (예: 픽셀 수, 영상 길이)"""
+        estimate = None
+        if self.estimator is not None and features is not None:
+            try:
+                estimate = self.estimator.stage_seconds(kind, stages, features)
+            except Exception as e:
+                print(f"[WARNING] Processing time estimate failed for {kind}: {e}")
+        job = Job(kind, stages, features, estimate)
+
+        with self._lock:
+            if self._active_count() >= self.max_workers + self.max_pending:
+                raise JobQueueFullError("처리 대기 중인 작업이 너무 많습니다. 잠시 후 다시 시도해주세요.")
+            if self.max_queue_wait_sec and self._queue_wait(list(self._jobs.values()), time.time()) > self.max_queue_wait_sec:
+                raise JobQueueFullError("예상 대기 시간이 너무 깁니다. 잠시 후 다시 시도해주세요.")
+            self._jobs[job.id] = job
+            self._trim_history()
+
+        def run():
+            job.status = JOB_RUNNING
+            job.started_at = time.time()
+            try:
+                job.result = fn(job.report, *args, **kwargs)
+                job.status = JOB_SUCCEEDED
+                self._record(job)
+                return job.result
+            except Exception as e:
+                job.error = str(e)
+                job.status = JOB_FAILED
+                print(f"[ERROR] Job {job.id} ({kind}) failed: {e}")
+                print(traceback.format_exc())
+                raise
+            finally:
+                job.finished_at = time.time()
+
+        job.future = self._executor.submit(run)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def stats(self):
+        with self._lock:
+            counts = {}
+            for job in self._jobs.values():
+                counts[job.status] = counts.get(job.status, 0) + 1
+        return {"max_workers": self.max_workers, "jobs": counts, "queue_wait_seconds": round(self.queue_wait_seconds(), 1)}
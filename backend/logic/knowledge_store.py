@@ -0,0 +1,325 @@
+import glob
+import hashlib
+import json
+import os
+import pickle
+import shutil
+import threading
+from logic.result_cache import hash_file
+
+EMBEDDING_MODEL = "models/embedding-001"
+# 인덱스 저장 형식이나 청크 분할 방식이 바뀌면 올려서 기존 인덱스를 무효화
+INDEX_FORMAT_VERSION = 2
+
+DEFAULT_INDEX_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "results", "cache", "kb_index"
+)
+
+
+class KnowledgeStore:
+    """
+    지식 베이스 FAISS 인덱스의 디스크 저장소.
+    index_dir/<버전>/ 아래에 index.faiss, docstore.pkl, manifest.json(파일별 sha256과 청크 id, 임베딩 모델,
+    청크 설정)을 저장하고, CURRENT 파일이 현재 버전을 가리킨다. 시작 시 manifest가 현재 knowledge_base와 같으면
+    임베딩 API를 호출하지 않고 저장된 인덱스를 그대로 불러온다.
+
+    파일이 추가/변경/삭제되면 해당 파일의 청크만 다시 임베딩해 인덱스에 반영하고(증분 갱신),
+    임베딩 모델이나 청크 설정이 바뀐 경우에만 전체를 다시 만든다. 갱신은 기존 인덱스의 복사본에 적용한 뒤
+    self.store를 통째로 교체하므로, 진행 중인 검색은 이전 인덱스로 안전하게 끝난다.
+    읽기에 실패한 파일은 sha256과 함께 기록해 두고, 내용이 바뀔 때만 다시 시도한다.
+    """
+
+    def __init__(self, kb_dir, index_dir=None, embeddings=None, embedding_model=EMBEDDING_MODEL,
+                 chunk_size=500, chunk_overlap=100):
+        self.kb_dir = kb_dir
+        self.index_dir = index_dir or os.getenv("KNOWLEDGE_INDEX_DIR", DEFAULT_INDEX_DIR)
+        self.embeddings = embeddings
+        self.embedding_model = embedding_model
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        os.makedirs(self.index_dir, exist_ok=True)
+
+        # 현재 사용 중인 인덱스와 그 manifest
+        self.store = None
+        self.manifest = None
+        self._update_lock = threading.Lock()
+        # 파일 이름 → (mtime_ns, size, sha256): 바뀌지 않은 파일은 다시 해시하지 않는다
+        self._stat_cache = {}
+        # 파일 이름 → 읽기에 실패한 내용의 sha256
+        self._failed = {}
+        self._watcher = None
+        self._stop = threading.Event()
+
+    def scan(self):
+        """knowledge_base의 .txt 파일 → sha256"""
+        files = {}
+        stat_cache = {}
+        for path in sorted(glob.glob(os.path.join(self.kb_dir, "*.txt"))):
+            name = os.path.basename(path)
+            stat = os.stat(path)
+            cached = self._stat_cache.get(name)
+            if cached and cached[:2] == (stat.st_mtime_ns, stat.st_size):
+                digest = cached[2]
+            else:
+                digest = hash_file(path)
+            stat_cache[name] = (stat.st_mtime_ns, stat.st_size, digest)
+            files[name] = digest
+        self._stat_cache = stat_cache
+        return files
+
+    def _skip_failed(self, hashes):
+        """실패한 뒤 내용이 바뀌지 않은 파일을 제외 (삭제되거나 바뀐 파일은 실패 기록에서 지운다)"""
+        self._failed = {name: digest for name, digest in self._failed.items() if hashes.get(name) == digest}
+        return {name: digest for name, digest in hashes.items() if name not in self._failed}
+
+    def settings(self):
+        """이 값이 바뀌면 증분 갱신이 불가능하므로 전체를 다시 임베딩한다"""
+        return {
+            "format_version": INDEX_FORMAT_VERSION,
+            "embedding_model": self.embedding_model,
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+        }
+
+    def make_manifest(self, files):
+        """files: 파일 이름 → {"sha256": ..., "ids": [청크 id, ...]}"""
+        return dict(self.settings(), files=files)
+
+    @staticmethod
+    def manifest_version(manifest):
+        """manifest 내용으로 만든 버전 이름 (같은 내용이면 같은 버전)"""
+        payload = json.dumps(manifest, sort_keys=True, ensure_ascii=False)
+        return "v-" + hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def _current_version(self):
+        try:
+            with open(os.path.join(self.index_dir, "CURRENT"), "r", encoding="utf-8") as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _read_manifest(self, version):
+        try:
+            with open(os.path.join(self.index_dir, version, "manifest.json"), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+    def load_or_build(self):
+        """
+        저장된 인덱스를 재사용하거나(manifest 일치), 바뀐 파일만 반영하거나, 다시 만든다.
+        결과는 self.store / self.manifest에 저장하고 store를 반환한다. 문서가 없으면 None
+        """
+        with self._update_lock:
+            hashes = self.scan()
+            if not hashes:
+                print("[WARNING] No text files found in knowledge base directory")
+                return None
+            hashes = self._skip_failed(hashes)
+
+            version = self._current_version()
+            stored = self._read_manifest(version) if version else None
+            store = None
+            if stored and {k: v for k, v in stored.items() if k != "files"} == self.settings():
+                try:
+                    store = self.load(version)
+                    print(f"[INFO] Knowledge index loaded from disk ({version})")
+                except Exception as e:
+                    print(f"[WARNING] Stored knowledge index unreadable, rebuilding: {e}")
+
+            if store is None:
+                print(f"[INFO] Knowledge index out of date, re-embedding {len(hashes)} files")
+                store, manifest = self.build(hashes)
+                if store is None:
+                    return None
+                self.save(store, manifest)
+            else:
+                manifest = stored
+                if self.diff(stored["files"], hashes) != ([], [], []):
+                    store, manifest = self.apply_diff(store, stored, hashes)
+                    self.save(store, manifest)
+
+            self.store, self.manifest = store, manifest
+            return store
+
+    @staticmethod
+    def diff(old_files, hashes):
+        """(추가, 변경, 삭제) 파일 이름 목록"""
+        added = [name for name in hashes if name not in old_files]
+        changed = [name for name in hashes if name in old_files and old_files[name]["sha256"] != hashes[name]]
+        removed = [name for name in old_files if name not in hashes]
+        return added, changed, removed
+
+    def refresh(self):
+        """
+        knowledge_base를 다시 스캔해 바뀐 파일만 증분 반영한다. 아직 인덱스가 없으면(시작 시 문서가 없었으면)
+        문서가 생겼을 때 전체를 만든다. 변경이 있었으면 새 store를 self.store에 교체하고 True 반환
+        """
+        with self._update_lock:
+            scanned = self.scan()
+            hashes = self._skip_failed(scanned)
+            if self.store is None:
+                if not hashes:
+                    return False
+                print(f"[INFO] Knowledge base files found, embedding {len(hashes)} files")
+                store, manifest = self.build(hashes)
+                if store is None:
+                    return False
+                self.save(store, manifest)
+                self.store, self.manifest = store, manifest
+                return True
+
+            added, changed, removed = self.diff(self.manifest["files"], hashes)
+            if not (added or changed or removed):
+                return False
+            if not scanned:
+                print("[WARNING] Knowledge base is empty, keeping the current index")
+                return False
+
+            print(f"[INFO] Knowledge base changed (added: {added}, changed: {changed}, removed: {removed})")
+            store, manifest = self.apply_diff(self.store, self.manifest, hashes)
+            self.save(store, manifest)
+            self.store, self.manifest = store, manifest
+            return True
+
+    def apply_diff(self, store, manifest, hashes):
+        """
+        바뀐 파일의 청크만 삭제/재임베딩한 새 store와 manifest 반환.
+        원본 store는 건드리지 않는다.
+        """
+        import faiss
+        from langchain_community.docstore.in_memory import InMemoryDocstore
+        from langchain_community.vectorstores import FAISS
+
+        old_files = manifest["files"]
+        added, changed, removed = self.diff(old_files, hashes)
+
+        updated = FAISS(
+            embedding_function=self.embeddings,
+            index=faiss.clone_index(store.index),
+            docstore=InMemoryDocstore(dict(store.docstore._dict)),
+            index_to_docstore_id=dict(store.index_to_docstore_id),
+        )
+
+        stale_ids = [chunk_id for name in changed + removed for chunk_id in old_files[name]["ids"]]
+        if stale_ids:
+            updated.delete(stale_ids)
+
+        files = {name: entry for name, entry in old_files.items() if name in hashes and name not in changed}
+        texts, ids, new_files = self.load_chunks(added + changed, hashes)
+        if texts:
+            updated.add_documents(texts, ids=ids)
+        files.update(new_files)
+
+        print(f"[INFO] Knowledge index updated: -{len(stale_ids)} / +{len(texts)} chunks")
+        return updated, self.make_manifest(dict(sorted(files.items())))
+
+    def load(self, version):
+        import faiss
+        from langchain_community.vectorstores import FAISS
+
+        version_dir = os.path.join(self.index_dir, version)
+        index_path = os.path.join(version_dir, "index.faiss")
+        # 평면(Flat) 인덱스는 faiss가 메모리 매핑을 지원하지 않아 전체를 읽는다 (지식 베이스 규모에서는 충분히 작다)
+        index = faiss.read_index(index_path)
+        with open(os.path.join(version_dir, "docstore.pkl"), "rb") as f:
+            docstore, index_to_docstore_id = pickle.load(f)
+        return FAISS(
+            embedding_function=self.embeddings,
+            index=index,
+            docstore=docstore,
+            index_to_docstore_id=index_to_docstore_id,
+        )
+
+    def load_chunks(self, names, hashes):
+        """
+        파일들을 읽어 청크로 분할. (청크 목록, 청크 id 목록, 파일별 manifest 항목) 반환
+        청크 id는 "파일명:해시:순번"이라 파일 단위로 삭제/교체할 수 있다.
+        """
+        from langchain_community.document_loaders import TextLoader
+        from langchain.text_splitter import CharacterTextSplitter
+
+        # 최적화된 청크 설정
+        text_splitter = CharacterTextSplitter(
+            chunk_size=self.chunk_size,
+            chunk_overlap=self.chunk_overlap,
+            separator="\n",
+            length_function=len
+        )
+
+        texts, ids, files = [], [], {}
+        for name in names:
+            file_path = os.path.join(self.kb_dir, name)
+            try:
+                chunks = text_splitter.split_documents(TextLoader(file_path, encoding='utf-8').load())
+                print(f"[INFO] Loaded {len(chunks)} chunks from {file_path}")
+            except Exception as e:
+                print(f"[ERROR] Failed to load {file_path} (skipped until it changes): {str(e)}")
+                self._failed[name] = hashes[name]
+                continue
+            chunk_ids = [f"{name}:{hashes[name][:12]}:{i}" for i in range(len(chunks))]
+            texts.extend(chunks)
+            ids.extend(chunk_ids)
+            files[name] = {"sha256": hashes[name], "ids": chunk_ids}
+        return texts, ids, files
+
+    def build(self, hashes):
+        """전체 임베딩. (store, manifest) 반환 (문서가 없으면 store는 None)"""
+        from langchain_community.vectorstores import FAISS
+
+        texts, ids, files = self.load_chunks(sorted(hashes), hashes)
+        if not texts:
+            print("[WARNING] No valid documents loaded from knowledge base")
+            return None, None
+        print(f"[INFO] Split into {len(texts)} text chunks")
+        return FAISS.from_documents(texts, self.embeddings, ids=ids), self.make_manifest(files)
+
+    def save(self, store, manifest):
+        """새 버전 디렉토리에 저장한 뒤 CURRENT를 원자적으로 교체하고 이전 버전을 정리"""
+        import faiss
+
+        version = self.manifest_version(manifest)
+        version_dir = os.path.join(self.index_dir, version)
+        tmp_dir = f"{version_dir}.tmp-{os.getpid()}"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+
+        faiss.write_index(store.index, os.path.join(tmp_dir, "index.faiss"))
+        with open(os.path.join(tmp_dir, "docstore.pkl"), "wb") as f:
+            pickle.dump((store.docstore, store.index_to_docstore_id), f)
+        with open(os.path.join(tmp_dir, "manifest.json"), "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False, indent=2)
+
+        shutil.rmtree(version_dir, ignore_errors=True)
+        os.replace(tmp_dir, version_dir)
+
+        current_tmp = os.path.join(self.index_dir, f"CURRENT.tmp-{os.getpid()}")
+        with open(current_tmp, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(current_tmp, os.path.join(self.index_dir, "CURRENT"))
+        print(f"[INFO] Knowledge index saved ({version})")
+
+        for name in os.listdir(self.index_dir):
+            if name.startswith("v-") and name != version and ".tmp-" not in name:
+                shutil.rmtree(os.path.join(self.index_dir, name), ignore_errors=True)
+        return version
+
+    def watch(self, interval_sec, on_update=None):
+        """
+        백그라운드에서 interval_sec마다 refresh()를 실행한다.
+        변경이 반영되면 on_update(새 store)를 호출 (예: RetrievalQA의 retriever 교체)
+        """
+        def run():
+            while not self._stop.wait(interval_sec):
+                try:
+                    if self.refresh() and on_update is not None:
+                        on_update(self.store)
+                except Exception as e:
+                    print(f"[ERROR] Knowledge base reload failed: {str(e)}")
+
+        if self._watcher is None:
+            self._watcher = threading.Thread(target=run, name="knowledge-watcher", daemon=True)
+            self._watcher.start()
+
+    def stop_watching(self):
+        self._stop.set()
@@ -0,0 +1,61 @@
+# 응답 최대 줄 수 (빈 줄 제외)
+MAX_RESPONSE_LINES = 3
+
+
+def limit_lines(text: str, max_lines=MAX_RESPONSE_LINES) -> str:
+    """응답 앞뒤 공백을 지우고 비어 있지 않은 줄 max_lines개만 남긴다 (줄 안의 들여쓰기는 유지)"""
+    lines = [line for line in text.strip().split('\n') if line.strip()]
+    return '\n'.join(lines[:max_lines])
+
+
+class LineLimiter:
+    """
+    스트리밍 응답 조각을 받아 limit_lines와 같은 결과를 조각 단위로 내보낸다.
+    공백은 바로 내보내지 않고 보류했다가 뒤에 글자가 나올 때 내보낸다:
+    - 줄 앞 공백(들여쓰기)은 그 줄에 글자가 나오면 유지하고, 공백만 있는 줄은 버린다
+    - 줄 끝 공백은 응답이 더 이어질 때만 유지한다 (전체 응답의 strip()과 같은 결과)
+    max_lines 줄을 넘는 다음 줄의 글자가 나오면 done이 되어 이후 입력은 무시한다.
+    """
+
+    def __init__(self, max_lines=MAX_RESPONSE_LINES):
+        self.max_lines = max_lines
+        self.lines = 0
+        self.done = False
+        # 마지막 글자 뒤의 같은 줄 공백 / 새 줄 앞 공백 (아직 내보내지 않음)
+        self._trailing = []
+        self._leading = []
+        self._after_newline = False
+
+    def feed(self, chunk: str) -> str:
+        out = []
+        for ch in chunk:
+            if self.done:
+                break
+            if ch == "\n":
+                if self.lines:
+                    self._after_newline = True
+                    self._leading = []
+                continue
+            if ch.isspace():
+                # 첫 글자 전의 공백은 strip()으로 지워진다
+                if self.lines:
+                    (self._leading if self._after_newline else self._trailing).append(ch)
+                continue
+
+            if self._after_newline:
+                out.extend(self._trailing)
+                if self.lines >= self.max_lines:
+                    self.done = True
+                    break
+                out.append("\n")
+                out.extend(self._leading)
+                self.lines += 1
+                self._after_newline = False
+                self._leading = []
+            elif self.lines:
+                out.extend(self._trailing)
+            else:
+                self.lines = 1
+            self._trailing = []
+            out.append(ch)
+        return "".join(out)
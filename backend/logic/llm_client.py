@@ -0,0 +1,223 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+# 스트림 종료 표시
+_END = object()
+
+
+class LLMTimeoutError(TimeoutError):
+    """호출 기한(deadline) 안에 LLM 응답을 받지 못함"""
+
+
+class _LatencyTracker:
+    """최근 성공 호출 지연 시간으로 p95를 추정"""
+
+    def __init__(self, window=200, min_samples=20):
+        self.samples = deque(maxlen=window)
+        self.min_samples = min_samples
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        with self._lock:
+            self.samples.append(seconds)
+
+    def p95(self):
+        with self._lock:
+            if len(self.samples) < self.min_samples:
+                return None
+            ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+class GeminiClient:
+    """
+    LLMPromptRefiner와 챗봇이 함께 쓰는 Gemini 호출 계층.
+    genai.configure와 GenerativeModel 생성은 모델별로 한 번만 하고, 호출은 전용 이벤트 루프 스레드에서
+    비동기(grpc.aio)로 실행해 하나의 채널(연결)을 재사용한다.
+
+    - 호출마다 기한(deadline_sec)을 두어 느린 응답이 작업 스레드를 오래 붙잡지 않게 한다 (초과 시 LLMTimeoutError)
+    - 첫 요청이 최근 p95 지연을 넘기면 같은 요청을 한 번 더 보내(hedge) 먼저 끝난 응답을 쓴다.
+      첫 요청이 기한 전에 실패해도 두 번째 요청으로 한 번 재시도한다.
+    - 기본 키(GOOGLE_API_KEY)는 genai.configure로 전역 설정하고, 다른 키를 쓰는 클라이언트는 전역 설정을 바꾸지 않고
+      모델마다 그 키로 만든 비동기 API 클라이언트를 붙인다. 키별 인스턴스는 get_llm_client(api_key)로 공유한다.
+    """
+
+    def __init__(self, api_key=None, deadline_sec=None, hedge_after_sec=None):
+        import google.generativeai as genai
+
+        default_key = os.getenv("GOOGLE_API_KEY")
+        self.api_key = api_key or default_key
+        if not self.api_key:
+            raise ValueError("GOOGLE_API_KEY 환경 변수가 설정되지 않았습니다.")
+        self._uses_default_key = self.api_key == default_key
+        if self._uses_default_key:
+            genai.configure(api_key=self.api_key)
+        self._genai = genai
+        self._api_client = None
+
+        self.deadline_sec = deadline_sec or float(os.getenv("LLM_DEADLINE_SEC", "15"))
+        # p95 표본이 모이기 전 사용할 hedge 기준 시간
+        self.hedge_after_sec = hedge_after_sec or float(os.getenv("LLM_HEDGE_AFTER_SEC", "4"))
+
+        self._models = {}
+        self._latency = {}
+        self._lock = threading.Lock()
+        self.hedged = 0
+        self.timeouts = 0
+
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="llm-client-loop", daemon=True)
+        self._thread.start()
+
+    def _model(self, model_name):
+        with self._lock:
+            model = self._models.get(model_name)
+            if model is None:
+                model = self._genai.GenerativeModel(model_name=model_name)
+                if not self._uses_default_key:
+                    # 이벤트 루프 스레드에서 처음 호출되므로 grpc.aio 채널도 이 루프에 묶인다
+                    if self._api_client is None:
+                        from google.ai import generativelanguage as glm
+
+                        self._api_client = glm.GenerativeServiceAsyncClient(client_options={"api_key": self.api_key})
+                    model._async_client = self._api_client
+                self._models[model_name] = model
+                self._latency[model_name] = _LatencyTracker()
+            return model
+
+    def hedge_delay(self, model_name):
+        self._model(model_name)
+        p95 = self._latency[model_name].p95()
+        return p95 if p95 is not None else self.hedge_after_sec
+
+    async def _call(self, model_name, prompt, generation_config):
+        started_at = time.monotonic()
+        response = await self._model(model_name).generate_content_async(prompt, generation_config=generation_config)
+        text = response.text
+        self._latency[model_name].record(time.monotonic() - started_at)
+        return text
+
+    async def _generate(self, prompt, model_name, generation_config=None, deadline_sec=None, hedge=True):
+        deadline_sec = deadline_sec or self.deadline_sec
+        deadline = time.monotonic() + deadline_sec
+        tasks = [asyncio.ensure_future(self._call(model_name, prompt, generation_config))]
+        started_at = {tasks[0]: time.monotonic()}
+        hedge_at = time.monotonic() + self.hedge_delay(model_name) if hedge else None
+        last_error = None
+
+        try:
+            while tasks:
+                now = time.monotonic()
+                if now >= deadline:
+                    break
+                timeout = deadline - now
+                if hedge_at is not None:
+                    timeout = min(timeout, max(0.0, hedge_at - now))
+
+                done, _ = await asyncio.wait(tasks, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    tasks.remove(task)
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                    print(f"[LLM] {model_name} request failed: {last_error}")
+
+                # 첫 요청이 p95를 넘겼거나 실패했으면 두 번째 요청을 한 번만 보낸다
+                if hedge_at is not None and (not tasks or time.monotonic() >= hedge_at):
+                    hedge_at = None
+                    with self._lock:
+                        self.hedged += 1
+                    task = asyncio.ensure_future(self._call(model_name, prompt, generation_config))
+                    started_at[task] = time.monotonic()
+                    tasks.append(task)
+        finally:
+            # 기한을 넘긴 요청과 진 hedge 요청도 지금까지 걸린 시간(기한으로 상한)을 기록한다.
+            # 성공한 호출만 기록하면 백엔드가 느려질수록 p95가 낮게 추정되어 hedge 요청이 오히려 늘어난다
+            now = time.monotonic()
+            for task in tasks:
+                task.cancel()
+                self._latency[model_name].record(min(now - started_at[task], deadline_sec))
+
+        if tasks or last_error is None:
+            with self._lock:
+                self.timeouts += 1
+            raise LLMTimeoutError(f"{model_name} did not respond within {deadline_sec:.1f}s")
+        raise last_error
+
+    def generate(self, prompt, model_name, generation_config=None, deadline_sec=None, hedge=True):
+        """동기 호출 (작업 스레드용). 기한이 지나면 LLMTimeoutError"""
+        coroutine = self._generate(prompt, model_name, generation_config, deadline_sec, hedge)
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    async def agenerate(self, prompt, model_name, generation_config=None, deadline_sec=None, hedge=True):
+        """비동기 호출 (다른 이벤트 루프, 예: FastAPI 핸들러에서)"""
+        coroutine = self._generate(prompt, model_name, generation_config, deadline_sec, hedge)
+        return await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(coroutine, self._loop))
+
+    def stream(self, prompt, model_name, generation_config=None, deadline_sec=None):
+        """
+        응답 텍스트 조각을 내보내는 동기 이터레이터. 기한은 조각 사이 대기 시간에 적용된다.
+        이터레이터를 닫으면(close) 업스트림 스트림을 취소한다.
+        """
+        deadline_sec = deadline_sec or self.deadline_sec
+        chunks = queue.Queue()
+
+        async def pump():
+            try:
+                response = await self._model(model_name).generate_content_async(
+                    prompt, generation_config=generation_config, stream=True
+                )
+                async for chunk in response:
+                    chunks.put(chunk.text)
+                chunks.put(_END)
+            except asyncio.CancelledError:
+                chunks.put(_END)
+                raise
+            except Exception as e:
+                chunks.put(e)
+
+        future = asyncio.run_coroutine_threadsafe(pump(), self._loop)
+        try:
+            while True:
+                try:
+                    item = chunks.get(timeout=deadline_sec)
+                except queue.Empty:
+                    with self._lock:
+                        self.timeouts += 1
+                    raise LLMTimeoutError(f"{model_name} stream stalled for {deadline_sec:.1f}s")
+                if item is _END:
+                    return
+                if isinstance(item, BaseException):
+                    raise item
+                yield item
+        finally:
+            future.cancel()
+
+    def stats(self):
+        with self._lock:
+            models = list(self._latency)
+            counters = {"hedged": self.hedged, "timeouts": self.timeouts}
+        return dict(counters, p95_sec={name: self._latency[name].p95() for name in models})
+
+
+_clients = {}
+_client_lock = threading.Lock()
+
+
+def get_llm_client(api_key=None):
+    """
+    API 키별 프로세스 전역 GeminiClient (LLM_DEADLINE_SEC / LLM_HEDGE_AFTER_SEC로 설정).
+    api_key가 없으면 GOOGLE_API_KEY를 쓰는 기본 클라이언트
+    """
+    key = api_key or os.getenv("GOOGLE_API_KEY")
+    client = _clients.get(key)
+    if client is None:
+        with _client_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = GeminiClient(api_key=key)
+    return client
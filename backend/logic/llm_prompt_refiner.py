@@ -1,10 +1,15 @@
 import os
-import google.generativeai as genai
+from logic.llm_client import get_llm_client
+from logic.prompt_cache import PromptCache, get_prompt_cache
+
+MODEL_NAME = "models/gemini-1.5-pro"
 
 class LLMPromptRefiner:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, cache=None, deadline_sec=None):
         """
-        Gemini API Key를 받아 초기화. 없으면 keys/gemini_api_key.txt 파일에서 읽는다.
+        Gemini API Key를 받아 초기화. 없으면 GOOGLE_API_KEY 환경 변수에서 읽는다.
+        cache: PromptCache 인스턴스 (기본값은 프로세스 전역 캐시)
+        deadline_sec: 호출 기한(초). 초과 시 LLMTimeoutError (기본값은 LLM_DEADLINE_SEC)
         """
         if api_key:
             self.api_key = api_key
@@ -14,13 +19,26 @@ class LLMPromptRefiner:
             if not self.api_key:
                 raise ValueError("GOOGLE_API_KEY 환경 변수가 설정되지 않았습니다.")
 
-        genai.configure(api_key=self.api_key)
-        self.model = genai.GenerativeModel(model_name="models/gemini-1.5-pro")
+        # 연결과 모델 객체는 키별 프로세스 전역 클라이언트에서 공유
+        self.client = get_llm_client(self.api_key)
+        self.deadline_sec = deadline_sec
+        self.cache = cache or get_prompt_cache()
 
-    def refine_prompt(self, raw_caption):
+    def refine_prompt(self, raw_caption, ocr_texts=None):
         """
-        BLIP이 만든 원시 문장을 받아, MusicGen용 풍부한 감성 기반 자연어 프롬프트로 변환한다.
+        BLIP이 만든 원시 문장(과 선택적인 OCR 텍스트)을 받아, MusicGen용 풍부한 감성 기반 자연어 프롬프트로 변환한다.
+        같은 (정규화된) 입력은 캐시에서 바로 반환한다.
         """
+        cache_key = PromptCache.make_key(raw_caption, ocr_texts, MODEL_NAME)
+        # 캐시는 최적화일 뿐이므로 SQLite 오류(database is locked, 디스크 부족 등)는 결과에 영향을 주지 않는다
+        try:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                print(f"[PromptCache] hit ({self.cache.stats()})")
+                return cached
+        except Exception as e:
+            print(f"[WARNING] Prompt cache lookup failed: {e}")
+
         system_instruction = (
             f"당신은 음악을 만드는 인공지능 어시스턴트입니다.\n"
             f"주어진 장면 설명을 기반으로, 장면이 전달하는 전반적인 감성(분위기, 감정, 상황, 시간대, 배경)을 자연스럽게 파악하세요.\n"
@@ -30,12 +48,20 @@ class LLMPromptRefiner:
             f"상황에 맞는 감성을 자유롭게 해석하여 반영하세요.\n"
             f"장면 설명: '{raw_caption}'"
         )
+        ocr_lines = [t.strip() for t in (ocr_texts or []) if t and t.strip()]
+        if ocr_lines:
+            system_instruction += f"\n장면 속 텍스트: '{' / '.join(ocr_lines)}'"
 
-        response = self.model.generate_content(system_instruction)
-        refined_text = response.text.strip()
+        refined_text = self.client.generate(system_instruction, MODEL_NAME, deadline_sec=self.deadline_sec).strip()
 
         # 만약 여러 줄로 답했을 경우 첫 번째 문장만 사용
         first_line = refined_text.split("\n")[0].strip()
 
-        return first_line
+        try:
+            if first_line:
+                self.cache.put(cache_key, first_line)
+            print(f"[PromptCache] miss ({self.cache.stats()})")
+        except Exception as e:
+            print(f"[WARNING] Prompt cache store failed: {e}")
 
+        return first_line
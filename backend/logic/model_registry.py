@@ -0,0 +1,117 @@
+import os
+import threading
+
+# torch / transformers는 무거우므로 실제로 모델을 로드할 때 가져온다 (서버 시작 시간 단축)
+
+BLIP_MODEL_NAME = "Salesforce/blip-image-captioning-base"
+MUSICGEN_MODEL_NAME = "facebook/musicgen-small"
+
+
+def quantize_linear_int8(module):
+    """nn.Linear 레이어를 동적 int8 양자화 (CPU 추론 전용)"""
+    import torch
+
+    return torch.ao.quantization.quantize_dynamic(module, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+class ModelRegistry:
+    """
+    프로세스 전역 모델 레지스트리.
+    BLIP / MusicGen / Gemini 리파이너를 최초 요청 시 한 번만 로드하고 이후에는 같은 인스턴스를 빌려준다.
+    FastAPI 핸들러(스레드풀)에서 동시에 호출해도 같은 모델이 두 번 로드되지 않도록 키별 잠금을 사용한다.
+    """
+
+    def __init__(self, device=None, quantize=None):
+        if device is None:
+            import torch
+
+            device = "cuda" if torch.cuda.is_available() else "cpu"
+        self.device = device
+        # CPU에서만 적용되는 opt-in int8 동적 양자화 (AURA_INT8_CPU=1)
+        if quantize is None:
+            quantize = os.getenv("AURA_INT8_CPU", "0") == "1"
+        self.quantize = quantize
+        self._lock = threading.Lock()
+        self._key_locks = {}
+        self._entries = {}
+
+    def _get_or_load(self, key, loader):
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry
+
+        with self._lock:
+            key_lock = self._key_locks.setdefault(key, threading.Lock())
+
+        # 같은 키를 동시에 요청한 경우 하나만 로드하고 나머지는 대기 후 결과를 공유
+        with key_lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = loader()
+                self._entries[key] = entry
+        return entry
+
+    def _quantized(self, device):
+        return self.quantize and device == "cpu"
+
+    def get_blip(self, device=None):
+        """(processor, model) 튜플 반환"""
+        device = device or self.device
+        quantized = self._quantized(device)
+
+        def load():
+            from transformers import BlipForConditionalGeneration, BlipProcessor
+
+            print(f"[INFO] Loading BLIP model ({BLIP_MODEL_NAME}) on {device}{' [int8]' if quantized else ''}")
+            processor = BlipProcessor.from_pretrained(BLIP_MODEL_NAME)
+            model = BlipForConditionalGeneration.from_pretrained(BLIP_MODEL_NAME).to(device)
+            model.eval()
+            if quantized:
+                model = quantize_linear_int8(model)
+            return processor, model
+
+        return self._get_or_load(("blip", BLIP_MODEL_NAME, device, quantized), load)
+
+    def get_musicgen(self, model_name=MUSICGEN_MODEL_NAME, device=None):
+        """(processor, model) 튜플 반환"""
+        device = device or self.device
+        quantized = self._quantized(device)
+
+        def load():
+            from transformers import AutoProcessor, MusicgenForConditionalGeneration
+
+            print(f"[INFO] Loading MusicGen model ({model_name}) on {device}{' [int8]' if quantized else ''}")
+            processor = AutoProcessor.from_pretrained(model_name)
+            model = MusicgenForConditionalGeneration.from_pretrained(model_name).to(device)
+            model.eval()
+            if quantized:
+                # 연산 대부분이 모인 디코더와 텍스트 인코더만 양자화 (EnCodec 오디오 디코더는 fp32 유지)
+                model.decoder = quantize_linear_int8(model.decoder)
+                model.text_encoder = quantize_linear_int8(model.text_encoder)
+            return processor, model
+
+        return self._get_or_load(("musicgen", model_name, device, quantized), load)
+
+    def get_refiner(self):
+        """공유 LLMPromptRefiner 인스턴스 반환 (API 키가 없으면 ValueError)"""
+        from logic.llm_prompt_refiner import LLMPromptRefiner
+
+        return self._get_or_load(("refiner",), LLMPromptRefiner)
+
+    def is_loaded(self, kind):
+        """해당 종류('blip', 'musicgen', 'refiner')의 모델이 하나라도 로드되었는지 여부"""
+        return any(key[0] == kind for key in list(self._entries))
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry():
+    """프로세스 전역 ModelRegistry 싱글턴 반환"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = ModelRegistry()
+    return _registry
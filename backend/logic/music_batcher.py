@@ -0,0 +1,147 @@
+import math
+import os
+import threading
+import time
+from concurrent.futures import Future
+
+
+class _Request:
+    def __init__(self, prompt, duration):
+        self.prompt = prompt
+        self.duration = duration
+        self.enqueued_at = time.monotonic()
+        self.future = Future()
+
+
+class MusicBatchScheduler:
+    """
+    MusicGen 앞단의 동적 마이크로 배칭 스케줄러.
+    짧은 대기 시간(max_wait_ms) 동안 들어온 요청 중 목표 길이가 비슷한(같은 duration 버킷) 것들을 모아
+    한 번의 패딩된 배치로 생성하고, 각 호출자에게 자신의 오디오 조각을 돌려준다.
+    MusicGenerator.generate_music과 같은 인터페이스로 사용할 수 있다.
+    """
+
+    def __init__(self, generator=None, max_batch_size=None, max_wait_ms=None, duration_bucket_sec=5.0):
+        # MusicGenerator(모델)는 첫 생성 요청 시 로드 (지표 조회만으로는 로드하지 않음)
+        self._generator = generator
+        self.max_batch_size = max(1, max_batch_size or int(os.getenv("MUSICGEN_MAX_BATCH", "4")))
+        self.max_wait = (max_wait_ms if max_wait_ms is not None else int(os.getenv("MUSICGEN_MAX_WAIT_MS", "50"))) / 1000
+        self.duration_bucket_sec = duration_bucket_sec
+
+        self._cond = threading.Condition()
+        self._pending = {}
+        self._worker = None
+
+        # 지표
+        self._batches = 0
+        self._requests = 0
+        self._batch_size_counts = {}
+        self._queue_wait_total = 0.0
+        self._queue_wait_max = 0.0
+
+    @property
+    def generator(self):
+        if self._generator is None:
+            from logic.music_generator import MusicGenerator
+
+            self._generator = MusicGenerator()
+        return self._generator
+
+    def _bucket(self, duration):
+        return math.ceil(duration / self.duration_bucket_sec)
+
+    def _ensure_worker(self):
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="musicgen-batcher", daemon=True)
+            self._worker.start()
+
+    def generate_music(self, prompt: str, duration: float):
+        # 구간 생성이 필요한 긴 음악은 배칭하지 않고 바로 생성
+        if duration > self.generator.segment_sec:
+            return self.generator.generate_music(prompt, duration)
+
+        request = _Request(prompt, duration)
+        with self._cond:
+            self._pending.setdefault(self._bucket(duration), []).append(request)
+            self._ensure_worker()
+            self._cond.notify_all()
+
+        return request.future.result()
+
+    def _next_batch(self):
+        with self._cond:
+            while not self._pending:
+                self._cond.wait()
+
+            # 가장 오래 기다린 요청이 있는 버킷을 먼저 처리
+            bucket = min(self._pending, key=lambda b: self._pending[b][0].enqueued_at)
+            deadline = self._pending[bucket][0].enqueued_at + self.max_wait
+            while len(self._pending[bucket]) < self.max_batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            queue = self._pending[bucket]
+            batch, rest = queue[:self.max_batch_size], queue[self.max_batch_size:]
+            if rest:
+                self._pending[bucket] = rest
+            else:
+                del self._pending[bucket]
+            return batch
+
+    def _record(self, batch, started_at):
+        with self._cond:
+            self._batches += 1
+            self._requests += len(batch)
+            self._batch_size_counts[len(batch)] = self._batch_size_counts.get(len(batch), 0) + 1
+            for request in batch:
+                wait = started_at - request.enqueued_at
+                self._queue_wait_total += wait
+                self._queue_wait_max = max(self._queue_wait_max, wait)
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            started_at = time.monotonic()
+            self._record(batch, started_at)
+            print(f"[MusicGen] batch of {len(batch)} (durations: {[r.duration for r in batch]})")
+
+            try:
+                results = self.generator.generate_batch(
+                    [r.prompt for r in batch], [r.duration for r in batch]
+                )
+                for request, result in zip(batch, results):
+                    request.future.set_result(result)
+            except Exception as e:
+                print(f"[MusicGen 오류] 배치 생성 실패: {str(e)}")
+                for request in batch:
+                    request.future.set_exception(e)
+
+    def metrics(self):
+        with self._cond:
+            return {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "batches": self._batches,
+                "requests": self._requests,
+                "avg_batch_size": self._requests / self._batches if self._batches else 0.0,
+                "batch_size_counts": dict(self._batch_size_counts),
+                "avg_queue_wait_ms": self._queue_wait_total / self._requests * 1000 if self._requests else 0.0,
+                "max_queue_wait_ms": self._queue_wait_max * 1000,
+                "pending": sum(len(q) for q in self._pending.values()),
+            }
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_music_scheduler():
+    """프로세스 전역 MusicBatchScheduler 싱글턴 (MUSICGEN_MAX_BATCH / MUSICGEN_MAX_WAIT_MS로 설정)"""
+    global _scheduler
+    if _scheduler is None:
+        with _scheduler_lock:
+            if _scheduler is None:
+                _scheduler = MusicBatchScheduler()
+    return _scheduler
@@ -1,38 +1,182 @@
-from transformers import AutoProcessor, MusicgenForConditionalGeneration
 import torch
 import numpy as np
+from logic.model_registry import MUSICGEN_MODEL_NAME, get_model_registry
+
+# 이 길이(초)를 넘는 음악은 구간(window) 단위로 나눠 생성
+DEFAULT_SEGMENT_SEC = 15.0
+# 다음 구간의 조건(audio prompt)으로 넘기고 크로스페이드할 이전 구간 끝부분 길이(초)
+DEFAULT_OVERLAP_SEC = 2.0
 
 class MusicGenerator:
-    def __init__(self, model_name="facebook/musicgen-small"):
-        self.device = "cuda" if torch.cuda.is_available() else "cpu"
-        self.model = MusicgenForConditionalGeneration.from_pretrained(model_name)
-        self.processor = AutoProcessor.from_pretrained(model_name)
-        self.model.to(self.device)
+    def __init__(self, model_name=MUSICGEN_MODEL_NAME, registry=None,
+                 segment_sec=DEFAULT_SEGMENT_SEC, overlap_sec=DEFAULT_OVERLAP_SEC):
+        registry = registry or get_model_registry()
+        self.device = registry.device
+        self.processor, self.model = registry.get_musicgen(model_name, self.device)
+        self.segment_sec = segment_sec
+        self.overlap_sec = min(overlap_sec, segment_sec / 2)
+
+        audio_config = self.model.config.audio_encoder
+        self.sampling_rate = audio_config.sampling_rate
+        # 초당 오디오 토큰 수 (musicgen-small 기준 50)
+        self.frame_rate = getattr(audio_config, "frame_rate", None) or 50
+        self.samples_per_token = self.sampling_rate // self.frame_rate
+
+    def _generate_segment(self, prompt, max_new_tokens, audio_prompt=None):
+        """
+        한 구간 생성. audio_prompt가 있으면 그 오디오를 이어서 생성하며,
+        반환되는 오디오는 프롬프트 부분(재구성)을 앞에 포함한다.
+        """
+        processor_kwargs = {"text": [prompt], "padding": True, "return_tensors": "pt"}
+        if audio_prompt is not None:
+            processor_kwargs.update(audio=audio_prompt, sampling_rate=self.sampling_rate)
+        inputs = self.processor(**processor_kwargs).to(self.device)
+
+        with torch.no_grad():
+            audio_values = self.model.generate(
+                **inputs,
+                max_new_tokens=max_new_tokens,
+                do_sample=True,
+            )
+
+        # (batch, channels, samples) -> 모노
+        return audio_values[0].mean(dim=0).cpu().numpy()
+
+    def _generate_windowed(self, prompt, duration):
+        """
+        segment_sec 길이의 구간을 차례로 생성한다. 각 구간은 이전 구간의 마지막 overlap_sec를
+        audio prompt로 받아 이어서 생성하고, 겹치는 부분은 선형 크로스페이드로 연결한다.
+        구간 길이가 고정이므로 메모리는 일정하고 생성 시간은 길이에 비례한다.
+        """
+        segment_tokens = int(self.segment_sec * self.frame_rate)
+        overlap_tokens = int(self.overlap_sec * self.frame_rate)
+        overlap_samples = overlap_tokens * self.samples_per_token
+        total_samples = int(duration * self.sampling_rate)
+
+        pieces = [self._generate_segment(prompt, segment_tokens)]
+        generated = len(pieces[0])
+        window = 1
+
+        # 마지막 조각이 겹침 길이보다 짧으면(끝에 도달) 더 이어 붙이지 않는다
+        while generated < total_samples and len(pieces[-1]) >= overlap_samples:
+            window += 1
+            tail = pieces[-1][-overlap_samples:]
+            remaining_tokens = int(np.ceil((total_samples - generated) / self.samples_per_token))
+            new_tokens = min(segment_tokens - overlap_tokens, remaining_tokens)
+            print(f"[MusicGen] window {window}: {generated / self.sampling_rate:.1f}s / {duration:.1f}s")
+
+            segment = self._generate_segment(prompt, new_tokens, audio_prompt=tail)
+            if len(segment) <= overlap_samples:
+                break
+
+            # 이전 구간 끝과 새 구간 앞(재구성된 프롬프트 부분)을 크로스페이드
+            fade = np.linspace(0.0, 1.0, overlap_samples, dtype=np.float32)
+            pieces[-1] = pieces[-1][:-overlap_samples]
+            mixed = tail * (1.0 - fade) + segment[:overlap_samples] * fade
+            pieces.append(mixed)
+            pieces.append(segment[overlap_samples:])
+            generated += len(segment) - overlap_samples
+
+        return np.concatenate(pieces)[:total_samples]
+
+    def generate_batch(self, prompts, durations):
+        """
+        여러 프롬프트를 하나의 패딩된 배치로 생성하고, 각 요청 길이에 맞게 잘라 개별 결과를 반환한다.
+        (구간 생성이 필요 없는 segment_sec 이하 길이 전용)
+        """
+        inputs = self.processor(
+            text=list(prompts),
+            padding=True,
+            return_tensors="pt",
+        ).to(self.device)
+
+        max_len = int(max(durations) * self.frame_rate)
+        with torch.no_grad():
+            audio_values = self.model.generate(
+                **inputs,
+                max_length=max_len,
+                do_sample=True,
+            )
+
+        results = []
+        for i, duration in enumerate(durations):
+            # (channels, samples) -> 모노, 요청 길이만큼 자른 뒤 개별 정규화
+            audio_data = audio_values[i].mean(dim=0).cpu().numpy()
+            audio_data = audio_data[:int(duration * self.sampling_rate)]
+            audio_data = audio_data / np.abs(audio_data).max()
+            results.append({
+                'audio': audio_data.astype(np.float32),
+                'sampling_rate': self.sampling_rate
+            })
+        return results
+
+    def create_streamer(self, chunk_sec=1.0):
+        """generate_streaming에 넘길 스트리머 (chunk_sec마다 PCM 청크 생성)"""
+        from logic.music_streamer import MusicgenAudioStreamer
+
+        return MusicgenAudioStreamer(self.model, play_steps=max(1, int(chunk_sec * self.frame_rate)))
+
+    def generate_streaming(self, prompt: str, duration: float, streamer):
+        """
+        생성 진행 중에 streamer로 오디오 청크를 내보낸다 (호출 스레드에서 블로킹 실행).
+        소비자는 다른 스레드에서 streamer를 이터레이션하며 청크를 받는다.
+        소비자가 streamer.cancel()을 호출하면 다음 토큰 단계에서 생성을 멈춘다.
+        """
+        from logic.music_streamer import StreamCancelled
 
-    def generate_music(self, prompt: str, duration: float):
         try:
-            print(f"[MusicGen] 생성 프롬프트: {prompt}")
+            print(f"[MusicGen] 스트리밍 생성 프롬프트: {prompt}")
             inputs = self.processor(
                 text=[prompt],
                 padding=True,
                 return_tensors="pt",
             ).to(self.device)
 
-            # duration * 50: 초당 50 프레임 기준
-            max_len = int(duration * 50)
-            audio_values = self.model.generate(
-                **inputs,
-                max_length=max_len,
-                do_sample=True,
-            )
+            with torch.no_grad():
+                self.model.generate(
+                    **inputs,
+                    max_new_tokens=int(duration * self.frame_rate),
+                    do_sample=True,
+                    streamer=streamer,
+                )
+        except StreamCancelled:
+            print("[MusicGen] 스트리밍 생성 취소됨 (클라이언트 연결 종료)")
+            streamer.end()
+        except Exception as e:
+            print(f"[MusicGen 오류] 스트리밍 생성 실패: {str(e)}")
+            streamer.fail(e)
+            raise
+
+    def generate_music(self, prompt: str, duration: float):
+        try:
+            print(f"[MusicGen] 생성 프롬프트: {prompt}")
+
+            if duration > self.segment_sec:
+                audio_data = self._generate_windowed(prompt, duration)
+            else:
+                inputs = self.processor(
+                    text=[prompt],
+                    padding=True,
+                    return_tensors="pt",
+                ).to(self.device)
+
+                # duration * 50: 초당 50 프레임 기준
+                max_len = int(duration * self.frame_rate)
+                with torch.no_grad():
+                    audio_values = self.model.generate(
+                        **inputs,
+                        max_length=max_len,
+                        do_sample=True,
+                    )
+
+                audio_data = audio_values.cpu().numpy().squeeze()
 
-            audio_data = audio_values.cpu().numpy().squeeze()
             audio_data = audio_data / np.abs(audio_data).max()
             audio_data = audio_data.astype(np.float32)
 
             return {
                 'audio': audio_data,
-                'sampling_rate': self.model.config.audio_encoder.sampling_rate
+                'sampling_rate': self.sampling_rate
             }
 
         except Exception as e:
@@ -0,0 +1,127 @@
+import queue
+import struct
+import numpy as np
+import torch
+from transformers.generation.streamers import BaseStreamer
+
+# 스트림 종료 표시
+_END = object()
+# 무음 구간을 증폭하지 않도록 정규화 기준 피크의 하한
+MIN_PEAK = 1e-4
+
+
+class StreamCancelled(Exception):
+    """소비자가 스트림을 취소함 (클라이언트 연결 종료 등)"""
+
+
+def wav_stream_header(sampling_rate, channels=1, bits_per_sample=16):
+    """
+    길이를 모르는 스트리밍용 WAV(PCM) 헤더. RIFF/data 크기는 0xFFFFFFFF로 채운다.
+    (브라우저와 대부분의 플레이어는 이 값을 '끝까지 읽기'로 처리한다)
+    """
+    block_align = channels * bits_per_sample // 8
+    return struct.pack(
+        "<4sI4s4sIHHIIHH4sI",
+        b"RIFF", 0xFFFFFFFF, b"WAVE",
+        b"fmt ", 16, 1, channels, sampling_rate, sampling_rate * block_align, block_align, bits_per_sample,
+        b"data", 0xFFFFFFFF,
+    )
+
+
+def to_pcm16(audio):
+    """float 오디오 [-1, 1] → 16-bit little-endian PCM 바이트"""
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype("<i2").tobytes()
+
+
+class MusicgenAudioStreamer(BaseStreamer):
+    """
+    MusicGen generate()의 streamer. play_steps 토큰마다 지금까지의 코드북 토큰을
+    오디오로 디코딩하고, 아직 내보내지 않은 구간만 PCM 청크로 큐에 넣는다.
+    마지막 stride 샘플은 다음 디코딩에서 값이 바뀔 수 있으므로 보류했다가 다음 청크에 포함한다.
+    배치 크기 1 전용이며, 소비자는 이 객체를 이터레이터로 사용한다.
+
+    전체 길이의 피크를 미리 알 수 없으므로, 지금까지 내보낸 구간의 최대 피크로 나눠 정규화한다
+    (generate_music의 피크 정규화와 같은 레벨, 게인은 줄어들기만 하므로 클리핑되지 않는다).
+    cancel()이 호출되면 다음 put()에서 StreamCancelled를 던져 generate()를 중단시킨다.
+    """
+
+    def __init__(self, model, play_steps=50, timeout=None):
+        self.decoder = model.decoder
+        self.audio_encoder = model.audio_encoder
+        self.generation_config = model.generation_config
+        self.play_steps = play_steps
+        self.timeout = timeout
+
+        hop_length = int(np.prod(self.audio_encoder.config.upsampling_ratios))
+        self.stride = max(0, hop_length * (play_steps - self.decoder.num_codebooks) // 6)
+
+        self.token_cache = None
+        self.to_yield = 0
+        self.peak = MIN_PEAK
+        self.cancelled = False
+        self.audio_queue = queue.Queue()
+
+    def _decode(self, input_ids):
+        # delay pattern을 되돌리고 패딩 토큰을 제거한 뒤 EnCodec으로 디코딩
+        _, delay_pattern_mask = self.decoder.build_delay_pattern_mask(
+            input_ids[:, :1],
+            pad_token_id=self.generation_config.decoder_start_token_id,
+            max_length=input_ids.shape[-1],
+        )
+        input_ids = self.decoder.apply_delay_pattern_mask(input_ids, delay_pattern_mask)
+        input_ids = input_ids[input_ids != self.generation_config.pad_token_id].reshape(
+            1, self.decoder.num_codebooks, -1
+        )
+        input_ids = input_ids[None, ...].to(self.audio_encoder.device)
+
+        with torch.no_grad():
+            output_values = self.audio_encoder.decode(input_ids, audio_scales=[None])
+        return output_values.audio_values[0, 0].cpu().float().numpy()
+
+    def _emit(self, audio):
+        self.peak = max(self.peak, float(np.abs(audio).max(initial=0.0)))
+        self.audio_queue.put((audio / self.peak).astype(np.float32))
+
+    def cancel(self):
+        """생성 중단 요청 (소비자 스레드에서 호출)"""
+        self.cancelled = True
+
+    def put(self, value):
+        if self.cancelled:
+            raise StreamCancelled()
+        if value.shape[0] // self.decoder.num_codebooks > 1:
+            raise ValueError("MusicgenAudioStreamer는 배치 크기 1만 지원합니다.")
+
+        if self.token_cache is None:
+            self.token_cache = value
+        else:
+            self.token_cache = torch.cat([self.token_cache, value[:, None]], dim=-1)
+
+        if self.token_cache.shape[-1] % self.play_steps == 0:
+            audio_values = self._decode(self.token_cache)
+            end = len(audio_values) - self.stride
+            if end > self.to_yield:
+                self._emit(audio_values[self.to_yield:end])
+                self.to_yield = end
+
+    def end(self):
+        if self.token_cache is not None and not self.cancelled:
+            audio_values = self._decode(self.token_cache)
+            if len(audio_values) > self.to_yield:
+                self._emit(audio_values[self.to_yield:])
+        self.audio_queue.put(_END)
+
+    def fail(self, error):
+        """생성 도중 오류를 소비자에게 전달"""
+        self.audio_queue.put(error)
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        value = self.audio_queue.get(timeout=self.timeout)
+        if value is _END:
+            raise StopIteration()
+        if isinstance(value, BaseException):
+            raise value
+        return value
@@ -0,0 +1,137 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+DEFAULT_DB_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "results", "cache", "prompt_cache.sqlite3"
+)
+
+
+def normalize_text(text: str) -> str:
+    """소문자화 + 공백 정리 + 앞뒤 구두점 제거"""
+    text = re.sub(r"\s+", " ", (text or "").strip().lower())
+    return text.strip(" .,!?;:'\"")
+
+
+class PromptCache:
+    """
+    LLMPromptRefiner 결과 캐시.
+    메모리 LRU(최근 항목) 앞단 + SQLite 디스크 캐시(프로세스 재시작 후에도 유지)의 2단 구조이며,
+    TTL이 지난 항목은 무시/삭제하고 디스크 항목 수가 max_disk_entries를 넘으면 오래 안 쓴 항목부터 지운다.
+    """
+
+    def __init__(self, db_path=DEFAULT_DB_PATH, max_memory_entries=512,
+                 max_disk_entries=10000, ttl_sec=7 * 24 * 3600):
+        self.db_path = db_path
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_sec = ttl_sec
+
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()
+        self.hits = {"memory": 0, "disk": 0}
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS prompt_cache ("
+            "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+            "created REAL NOT NULL, last_used REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(caption, ocr_texts=None, model_name=""):
+        """정규화한 캡션 + OCR 텍스트(+ 모델명)로 캐시 키 생성"""
+        ocr = " | ".join(normalize_text(t) for t in (ocr_texts or []) if t and t.strip())
+        payload = "\x1f".join([model_name, normalize_text(caption), ocr])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _remember(self, key, value, created):
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created = entry
+                if now - created <= self.ttl_sec:
+                    self._memory.move_to_end(key)
+                    self.hits["memory"] += 1
+                    return value
+                del self._memory[key]
+
+            row = self._conn.execute(
+                "SELECT value, created FROM prompt_cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None:
+                value, created = row
+                if now - created <= self.ttl_sec:
+                    self._conn.execute(
+                        "UPDATE prompt_cache SET last_used = ? WHERE key = ?", (now, key)
+                    )
+                    self._conn.commit()
+                    self._remember(key, value, created)
+                    self.hits["disk"] += 1
+                    return value
+                self._conn.execute("DELETE FROM prompt_cache WHERE key = ?", (key,))
+                self._conn.commit()
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO prompt_cache (key, value, created, last_used) VALUES (?, ?, ?, ?)",
+                (key, value, now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now):
+        self._conn.execute("DELETE FROM prompt_cache WHERE created < ?", (now - self.ttl_sec,))
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM prompt_cache").fetchone()
+        overflow = count - self.max_disk_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM prompt_cache WHERE key IN "
+                "(SELECT key FROM prompt_cache ORDER BY last_used ASC LIMIT ?)",
+                (overflow,),
+            )
+
+    def stats(self):
+        with self._lock:
+            total = self.hits["memory"] + self.hits["disk"] + self.misses
+            return {
+                "memory_hits": self.hits["memory"],
+                "disk_hits": self.hits["disk"],
+                "misses": self.misses,
+                "hit_rate": (total - self.misses) / total if total else 0.0,
+                "memory_entries": len(self._memory),
+            }
+
+
+_prompt_cache = None
+_prompt_cache_lock = threading.Lock()
+
+
+def get_prompt_cache():
+    """프로세스 전역 PromptCache 싱글턴 (경로는 PROMPT_CACHE_PATH 환경 변수로 변경 가능)"""
+    global _prompt_cache
+    if _prompt_cache is None:
+        with _prompt_cache_lock:
+            if _prompt_cache is None:
+                _prompt_cache = PromptCache(os.getenv("PROMPT_CACHE_PATH", DEFAULT_DB_PATH))
+    return _prompt_cache
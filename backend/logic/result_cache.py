@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+import time
+from concurrent.futures import Future
+
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def hash_file(path: str) -> str:
+    """파일 내용을 청크 단위로 읽어 sha256 해시 반환"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """
+    업로드 내용 해시 + 생성 파라미터를 키로 하는 결과 파일 캐시.
+    결과 파일은 cache_dir 아래에 <key><suffix>로 저장되고, index.json에 메타데이터를 기록한다.
+    같은 키의 계산이 진행 중이면 새 요청은 그 계산 결과를 기다려 공유한다 (in-flight coalescing).
+    새 결과를 넣을 때 ttl_sec보다 오래된 항목을 지우고, 전체 크기가 max_bytes를 넘으면 오래 안 쓴 항목부터 지운다.
+    """
+
+    def __init__(self, cache_dir, max_bytes=None, ttl_sec=None):
+        self.cache_dir = str(cache_dir)
+        self.index_path = os.path.join(self.cache_dir, "index.json")
+        self.max_bytes = max_bytes or int(os.getenv("RESULT_CACHE_MAX_BYTES", str(5 * 1024 ** 3)))
+        self.ttl_sec = ttl_sec or float(os.getenv("RESULT_CACHE_TTL_SEC", str(30 * 24 * 3600)))
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._in_flight = {}
+        self._index = self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"[WARNING] Result cache index unreadable, starting empty: {e}")
+            return {}
+
+    def _save_index(self):
+        # 임시 파일에 쓴 뒤 rename 하여 인덱스가 깨지지 않도록 한다
+        tmp_path = f"{self.index_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self._index, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, self.index_path)
+
+    @staticmethod
+    def make_key(content_hash: str, params: dict) -> str:
+        """업로드 해시와 생성 파라미터(정렬된 JSON)로 캐시 키 생성"""
+        payload = json.dumps({"content": content_hash, "params": params}, sort_keys=True)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        """캐시된 결과 파일 경로, 없으면 None"""
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                return None
+
+            path = os.path.join(self.cache_dir, entry["filename"])
+            if not os.path.exists(path):
+                # 파일이 외부에서 지워진 경우 인덱스에서도 제거
+                del self._index[key]
+                self._save_index()
+                return None
+
+            entry["last_hit"] = time.time()
+            entry["hits"] = entry.get("hits", 0) + 1
+            return path
+
+    def path_for(self, key, suffix):
+        """키에 해당하는 캐시 파일 경로 (결과를 이 경로에 바로 쓰면 이동/복사가 필요 없음)"""
+        return os.path.join(self.cache_dir, f"{key}{suffix}")
+
+    def put(self, key, src_path, suffix, params=None):
+        """
+        결과 파일을 캐시 디렉토리로 이동(rename)하고 인덱스에 등록한 뒤 최종 경로를 반환한다.
+        이미 path_for() 위치에 있는 파일은 그대로 등록만 한다.
+        """
+        filename = f"{key}{suffix}"
+        dest_path = os.path.join(self.cache_dir, filename)
+        if os.path.abspath(src_path) != os.path.abspath(dest_path):
+            shutil.move(src_path, dest_path)
+
+        with self._lock:
+            self._index[key] = {
+                "filename": filename,
+                "size": os.path.getsize(dest_path),
+                "params": params or {},
+                "created": time.time(),
+                "hits": 0,
+            }
+            self._evict(keep=key)
+            self._save_index()
+
+        return dest_path
+
+    def _evict(self, keep=None):
+        """TTL이 지난 항목 삭제 후, 전체 크기가 max_bytes 이하가 될 때까지 오래 안 쓴 항목부터 삭제 (keep 제외)"""
+        now = time.time()
+        entries = sorted(self._index.items(), key=lambda item: item[1].get("last_hit", item[1]["created"]))
+        total = sum(entry.get("size", 0) for _, entry in entries)
+
+        for key, entry in entries:
+            if key == keep:
+                continue
+            if now - entry["created"] <= self.ttl_sec and total <= self.max_bytes:
+                continue
+            try:
+                os.unlink(os.path.join(self.cache_dir, entry["filename"]))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"[WARNING] Failed to evict cached result {entry['filename']}: {e}")
+                continue
+            del self._index[key]
+            total -= entry.get("size", 0)
+            print(f"[Cache] evicted: {key[:12]} ({entry.get('size', 0)} bytes)")
+
+    def get_or_compute(self, key, compute, suffix, params=None):
+        """
+        캐시 히트면 즉시 경로를 반환하고, 미스면 compute(dest_path)로 결과 파일을 만든 뒤 캐시에 넣는다.
+        compute는 가능하면 dest_path에 직접 쓰고, 실제 결과 파일 경로를 반환해야 한다.
+        같은 키의 동시 요청은 하나의 계산을 공유한다.
+
+        Returns:
+            (path, hit) 튜플
+        """
+        cached = self.get(key)
+        if cached:
+            print(f"[Cache] hit: {key[:12]}")
+            return cached, True
+
+        with self._lock:
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+
+        if not owner:
+            print(f"[Cache] waiting for in-flight computation: {key[:12]}")
+            return future.result(), True
+
+        try:
+            # 잠금 획득 사이에 다른 요청이 완료했을 수 있으므로 다시 확인
+            path = self.get(key)
+            if path is None:
+                print(f"[Cache] miss: {key[:12]}")
+                path = self.put(key, compute(self.path_for(key, suffix)), suffix, params)
+            future.set_result(path)
+            return path, False
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
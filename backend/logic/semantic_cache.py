@@ -0,0 +1,168 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from logic.prompt_cache import normalize_text
+
+
+class _LanguageIndex:
+    """한 언어의 질문 임베딩 인덱스 (내적 = 코사인 유사도, 정규화된 벡터 사용)"""
+
+    def __init__(self, dim):
+        import faiss
+
+        self.index = faiss.IndexIDMap(faiss.IndexFlatIP(dim))
+        # id → (정규화된 질문, 답변, 저장 시각), 삽입 순서 = 오래된 순서
+        self.entries = OrderedDict()
+        # 정규화된 질문 → id (완전히 같은 질문은 임베딩 검색 없이 바로 찾는다)
+        self.by_text = {}
+
+    def remove(self, entry_id):
+        text, _, _ = self.entries.pop(entry_id)
+        self.by_text.pop(text, None)
+        self.index.remove_ids(np.array([entry_id], dtype=np.int64))
+
+
+class SemanticResponseCache:
+    """
+    챗봇 응답의 의미 기반 캐시.
+    정규화한 질문을 임베딩해 언어별 FAISS 인덱스에서 가장 비슷한 과거 질문을 찾고,
+    코사인 유사도가 threshold 이상이면 저장된 답변을 돌려준다 (LLM 호출 생략).
+    ttl_sec가 지난 항목은 조회 시 버리고, 언어별 max_entries를 넘으면 오래된 항목부터 제거한다.
+    """
+
+    def __init__(self, embeddings, threshold=None, ttl_sec=None, max_entries=None, embedding_cache_size=1024):
+        self.embeddings = embeddings
+        self.threshold = threshold or float(os.getenv("CHAT_CACHE_THRESHOLD", "0.92"))
+        self.ttl_sec = ttl_sec or float(os.getenv("CHAT_CACHE_TTL_SEC", str(24 * 3600)))
+        self.max_entries = max_entries or int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "2000"))
+        self._indexes = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        # 조회 시 계산한 임베딩을 저장 시 재사용 (질문당 임베딩 API 호출 1회)
+        self._vectors = OrderedDict()
+        self._embedding_cache_size = embedding_cache_size
+        self.hits = 0
+        self.misses = 0
+
+    def _embed(self, text):
+        with self._lock:
+            vector = self._vectors.get(text)
+            if vector is not None:
+                self._vectors.move_to_end(text)
+                return vector
+
+        vector = np.asarray(self.embeddings.embed_query(text), dtype=np.float32)
+        vector /= max(float(np.linalg.norm(vector)), 1e-12)
+
+        with self._lock:
+            self._vectors[text] = vector
+            while len(self._vectors) > self._embedding_cache_size:
+                self._vectors.popitem(last=False)
+        return vector
+
+    def lookup(self, question, lang):
+        """캐시된 답변 (없으면 None)"""
+        text = normalize_text(question)
+        if not text:
+            return None
+
+        with self._lock:
+            language_index = self._indexes.get(lang)
+            if language_index is None:
+                self.misses += 1
+                return None
+            entry_id = language_index.by_text.get(text)
+
+        if entry_id is None:
+            vector = self._embed(text)
+
+        with self._lock:
+            now = time.time()
+            if entry_id is None:
+                if language_index.index.ntotal == 0:
+                    self.misses += 1
+                    return None
+                scores, ids = language_index.index.search(vector[None, :], 1)
+                if ids[0][0] < 0 or scores[0][0] < self.threshold:
+                    self.misses += 1
+                    return None
+                entry_id = int(ids[0][0])
+
+            entry = language_index.entries.get(entry_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            if now - entry[2] > self.ttl_sec:
+                language_index.remove(entry_id)
+                self.misses += 1
+                return None
+
+            self.hits += 1
+            return entry[1]
+
+    def store(self, question, lang, answer):
+        text = normalize_text(question)
+        if not text or not answer:
+            return
+        vector = self._embed(text)
+
+        with self._lock:
+            language_index = self._indexes.get(lang)
+            if language_index is None:
+                language_index = self._indexes[lang] = _LanguageIndex(len(vector))
+
+            # 같은 질문이 이미 있으면 새 답변으로 교체
+            old_id = language_index.by_text.get(text)
+            if old_id is not None:
+                language_index.remove(old_id)
+
+            entry_id = self._next_id
+            self._next_id += 1
+            language_index.index.add_with_ids(vector[None, :], np.array([entry_id], dtype=np.int64))
+            language_index.entries[entry_id] = (text, answer, time.time())
+            language_index.by_text[text] = entry_id
+
+            while len(language_index.entries) > self.max_entries:
+                language_index.remove(next(iter(language_index.entries)))
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / total if total else 0.0,
+                "entries": {lang: len(index.entries) for lang, index in self._indexes.items()},
+                "threshold": self.threshold,
+            }
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """
+    프로세스 전역 SemanticResponseCache 싱글턴.
+    CHAT_CACHE_ENABLED=0 이거나 임베딩 클라이언트를 만들 수 없으면 None (캐시 없이 동작)
+    """
+    global _response_cache
+    if _response_cache is None:
+        with _response_cache_lock:
+            if _response_cache is None:
+                _response_cache = False
+                if os.getenv("CHAT_CACHE_ENABLED", "1") == "1":
+                    try:
+                        from langchain_google_genai.embeddings import GoogleGenerativeAIEmbeddings
+                        from logic.knowledge_store import EMBEDDING_MODEL
+
+                        embeddings = GoogleGenerativeAIEmbeddings(
+                            google_api_key=os.getenv("GOOGLE_API_KEY"),
+                            model=EMBEDDING_MODEL
+                        )
+                        _response_cache = SemanticResponseCache(embeddings)
+                    except Exception as e:
+                        print(f"[WARNING] Semantic response cache disabled: {e}")
+    return _response_cache or None
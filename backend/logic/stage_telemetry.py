@@ -0,0 +1,227 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+import numpy as np
+
+DEFAULT_TELEMETRY_DIR = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "results", "cache", "telemetry"
+)
+
+
+class StageModel:
+    """
+    한 단계 소요 시간의 선형 회귀 모델 (입력 특징은 표준화, 절편을 제외한 계수에 ridge 규제).
+    표본이 적어도 안정적으로 풀리고, 예측 분산(잔차 분산 + 계수 추정 불확실성)으로 신뢰 구간을 계산한다.
+    """
+
+    def __init__(self, features, mean, scale, coef, gram_inv, sigma, samples):
+        self.features = list(features)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        self.coef = np.asarray(coef, dtype=np.float64)
+        self.gram_inv = np.asarray(gram_inv, dtype=np.float64)
+        self.sigma = float(sigma)
+        self.samples = int(samples)
+
+    @classmethod
+    def fit(cls, features, X, y, ridge=1.0):
+        n, d = X.shape
+        mean = X.mean(axis=0)
+        scale = X.std(axis=0)
+        scale[scale == 0] = 1.0
+
+        A = np.hstack([np.ones((n, 1)), (X - mean) / scale])
+        penalty = ridge * np.eye(d + 1)
+        penalty[0, 0] = 0.0
+        gram_inv = np.linalg.inv(A.T @ A + penalty)
+        coef = gram_inv @ A.T @ y
+
+        residuals = y - A @ coef
+        sigma = np.sqrt(residuals @ residuals / max(1, n - d - 1))
+        return cls(features, mean, scale, coef, gram_inv, sigma, n)
+
+    def predict(self, values):
+        """(예상 초, 예측 분산)"""
+        x = np.array([float(values.get(name, 0.0)) for name in self.features])
+        a = np.concatenate([[1.0], (x - self.mean) / self.scale])
+        seconds = max(0.0, float(a @ self.coef))
+        variance = self.sigma ** 2 * (1.0 + float(a @ self.gram_inv @ a))
+        return seconds, variance
+
+    def to_dict(self):
+        return {
+            "features": self.features,
+            "mean": self.mean.tolist(),
+            "scale": self.scale.tolist(),
+            "coef": self.coef.tolist(),
+            "gram_inv": self.gram_inv.tolist(),
+            "sigma": self.sigma,
+            "samples": self.samples,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+class StageTelemetry:
+    """
+    파이프라인 단계별 실제 소요 시간과 입력 특징(픽셀 수, 영상 길이, 샘플링 프레임 수, 음악 길이 등)을 기록하고
+    (작업 종류, 장치, 단계)마다 StageModel을 학습한다.
+
+    - 기록은 samples.jsonl에 작업당 한 줄씩 추가하고, 학습한 모델은 models.json에 저장해 재시작 후에도 바로 쓴다
+    - 새 기록이 있고 마지막 학습 후 refit_sec가 지났으면 다음 기록/조회 시 다시 학습한다
+    - 학습에는 (작업 종류, 장치)별 최근 max_samples개만 사용한다 (하드웨어/모델 변경을 빠르게 반영)
+    """
+
+    def __init__(self, directory=None, refit_sec=None, min_samples=None, max_samples=None):
+        self.directory = directory or os.getenv("TELEMETRY_DIR", DEFAULT_TELEMETRY_DIR)
+        self.refit_sec = refit_sec or float(os.getenv("TELEMETRY_REFIT_SEC", "300"))
+        self.min_samples = min_samples or int(os.getenv("TELEMETRY_MIN_SAMPLES", "5"))
+        self.max_samples = max_samples or int(os.getenv("TELEMETRY_MAX_SAMPLES", "500"))
+        self.samples_path = os.path.join(self.directory, "samples.jsonl")
+        self.models_path = os.path.join(self.directory, "models.json")
+
+        self._lock = threading.Lock()
+        # (kind, device) → 최근 기록
+        self._samples = {}
+        # (kind, device, stage) → StageModel
+        self._models = {}
+        self._logged_lines = 0
+        self._dirty = False
+        self._fitted_at = 0.0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._load()
+
+    def _history(self, kind, device):
+        key = (kind, device)
+        if key not in self._samples:
+            self._samples[key] = deque(maxlen=self.max_samples)
+        return self._samples[key]
+
+    def _load(self):
+        if os.path.exists(self.samples_path):
+            with open(self.samples_path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        self._history(record["kind"], record["device"]).append(record)
+                        self._logged_lines += 1
+                    except (ValueError, KeyError):
+                        # 비정상 종료로 잘린 마지막 줄 등은 무시
+                        continue
+
+        try:
+            with open(self.models_path, encoding="utf-8") as f:
+                saved = json.load(f)
+            self._models = {
+                tuple(entry["key"]): StageModel.from_dict(entry["model"]) for entry in saved["models"]
+            }
+            self._fitted_at = saved["fitted_at"]
+            self._dirty = saved["samples"] != self._logged_lines
+        except FileNotFoundError:
+            self._dirty = self._logged_lines > 0
+        except (ValueError, KeyError, TypeError) as e:
+            print(f"[WARNING] Stage time models unreadable, refitting: {e}")
+            self._dirty = self._logged_lines > 0
+
+        if self._models:
+            print(f"[INFO] Loaded {len(self._models)} stage time models ({self._logged_lines} samples)")
+
+    def record(self, kind, device, features, stage_seconds):
+        """작업 하나의 단계별 소요 시간 기록"""
+        record = {
+            "ts": time.time(),
+            "kind": kind,
+            "device": device,
+            "features": {name: float(value) for name, value in features.items()},
+            "stages": {stage: round(float(seconds), 3) for stage, seconds in stage_seconds.items()},
+        }
+        with self._lock:
+            with open(self.samples_path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(record) + "\n")
+            self._logged_lines += 1
+            self._history(kind, device).append(record)
+            self._dirty = True
+        self.maybe_refit()
+
+    def maybe_refit(self):
+        with self._lock:
+            if self._dirty and time.time() - self._fitted_at >= self.refit_sec:
+                self._refit()
+
+    def refit(self):
+        with self._lock:
+            self._refit()
+
+    def _refit(self):
+        models = {}
+        for (kind, device), history in self._samples.items():
+            records = list(history)
+            if len(records) < self.min_samples:
+                continue
+            # 특징 이름은 최근 기록 기준 (특징이 바뀌기 전 기록은 제외)
+            names = sorted(records[-1]["features"])
+            records = [r for r in records if all(name in r["features"] for name in names)]
+            if len(records) < self.min_samples:
+                continue
+
+            X = np.array([[r["features"][name] for name in names] for r in records], dtype=np.float64)
+            for stage in sorted({stage for r in records for stage in r["stages"]}):
+                rows = [i for i, r in enumerate(records) if stage in r["stages"]]
+                if len(rows) < self.min_samples:
+                    continue
+                y = np.array([records[i]["stages"][stage] for i in rows], dtype=np.float64)
+                models[(kind, device, stage)] = StageModel.fit(names, X[rows], y)
+
+        self._models = models
+        self._fitted_at = time.time()
+        self._dirty = False
+        self._save()
+        print(f"[INFO] Refitted {len(models)} stage time models")
+
+    def _save(self):
+        retained = sum(len(history) for history in self._samples.values())
+        # 학습에 쓰지 않는 오래된 기록이 쌓이면 기록 파일을 압축
+        if self._logged_lines > 2 * retained:
+            self._write_atomic(self.samples_path, "".join(
+                json.dumps(record) + "\n" for history in self._samples.values() for record in history
+            ))
+            self._logged_lines = retained
+
+        self._write_atomic(self.models_path, json.dumps({
+            "fitted_at": self._fitted_at,
+            "samples": self._logged_lines,
+            "models": [{"key": list(key), "model": model.to_dict()} for key, model in self._models.items()],
+        }))
+
+    def _write_atomic(self, path, text):
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def predict(self, kind, device, stage, features):
+        """(예상 초, 예측 분산, 학습 표본 수). 학습된 모델이 없으면 None"""
+        self.maybe_refit()
+        with self._lock:
+            model = self._models.get((kind, device, stage))
+        if model is None:
+            return None
+        seconds, variance = model.predict(features)
+        return seconds, variance, model.samples
+
+    def stats(self):
+        with self._lock:
+            return {
+                "samples": {f"{kind}@{device}": len(history) for (kind, device), history in self._samples.items()},
+                "models": {
+                    f"{kind}@{device}/{stage}": {"samples": model.samples, "residual_sec": round(model.sigma, 3)}
+                    for (kind, device, stage), model in self._models.items()
+                },
+                "fitted_at": self._fitted_at or None,
+                "pending_refit": self._dirty,
+            }
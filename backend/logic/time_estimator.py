@@ -1,43 +1,179 @@
-import torch
+import math
+from logic.stage_telemetry import StageTelemetry
+
+# 95% 신뢰 구간
+Z_95 = 1.96
+# 학습된 모델이 없는 단계의 사전 추정치 상대 표준편차
+PRIOR_RELATIVE_STD = 0.5
+# /estimate-processing-time/ 응답의 단계 이름 (기존 클라이언트 호환)
+IMAGE_STEP_NAMES = {
+    "caption": "caption_generation",
+    "ocr": "ocr_extraction",
+    "refine_prompt": "prompt_refinement",
+    "generate_music": "music_generation",
+}
+
+
+def image_features(image_size, audio_sec):
+    """이미지 → 음악 작업의 입력 특징"""
+    return {
+        "megapixels": image_size[0] * image_size[1] / (1024 * 1024),
+        "audio_sec": float(audio_sec),
+    }
+
+
+def video_features(video_info, size_bytes, interval_sec=1, max_frames=None):
+    """비디오 작업의 입력 특징 (video_info는 FrameExtractor.probe 결과)"""
+    duration = video_info.get("duration") or 0.0
+    # FrameExtractor와 같은 방식으로 샘플링될 프레임 수 계산
+    frame_count = video_info.get("frame_count", 0)
+    if max_frames:
+        frames_sampled = min(max_frames, max(0, frame_count))
+    else:
+        frames_sampled = math.ceil(frame_count / max(1, int(round(video_info["fps"] * interval_sec))))
+    return {
+        "megapixels": video_info.get("width", 0) * video_info.get("height", 0) / (1024 * 1024),
+        "duration_sec": duration,
+        "frames_sampled": frames_sampled,
+        # 음악은 영상 길이만큼 생성
+        "audio_sec": duration,
+        "size_mb": size_bytes / (1024 * 1024),
+    }
+
 
 class ProcessingTimeEstimator:
-    def __init__(self):
+    """
+    파이프라인 처리 시간 추정기.
+    작업이 끝날 때마다 단계별 실제 소요 시간을 StageTelemetry에 기록하고, 학습된 단계별 회귀 모델로
+    예상 시간과 95% 신뢰 구간을 계산한다. 표본이 부족한 단계는 하드웨어 기준 사전 추정치를 사용한다.
+    """
+
+    def __init__(self, telemetry=None):
         self.base_time = 5  # 기본 처리 시간 (이미지 로딩, 저장 등)
-        
-    def estimate_processing_time(self, image_size, has_cuda=None):
+        self.telemetry = telemetry or StageTelemetry()
+        self._has_cuda = None
+
+    def device(self, has_cuda=None):
+        if has_cuda is None:
+            if self._has_cuda is None:
+                import torch
+                self._has_cuda = torch.cuda.is_available()
+            has_cuda = self._has_cuda
+        return "cuda" if has_cuda else "cpu"
+
+    def prior_seconds(self, kind, stage, features, has_cuda):
+        """학습 전 사용하는 단계별 사전 추정치 (초)"""
+        hardware = 0.5 if has_cuda else 2.0
+        megapixels = features.get("megapixels", 1.0)
+        # 음악 생성 시간은 주로 하드웨어와 생성 길이에 따라 달라짐 (10초 분량 기준 15초)
+        music_scale = features.get("audio_sec", 10.0) / 10.0
+
+        if kind == "video":
+            # 샘플링된 프레임마다 BLIP 캡셔닝 (프레임은 모델 입력 크기로 줄어드므로 해상도 영향은 작다)
+            per_frame = 0.3 * hardware
+            return {
+                "caption": per_frame * features.get("frames_sampled", 0) + 0.1 * features.get("size_mb", 0),
+                "refine_prompt": 2,
+                "generate_music": 15 * (0.7 if has_cuda else 2.0) * music_scale,
+                "save_music": 0.5,
+                "combine": 1 + 0.05 * features.get("size_mb", 0),
+                "save_result": 0.1,
+            }.get(stage, 0.0)
+
+        return {
+            "caption": 3 * megapixels * hardware,
+            "ocr": 2 * megapixels,
+            "refine_prompt": 2,
+            "generate_music": 15 * (0.7 if has_cuda else 2.0) * music_scale,
+        }.get(stage, 0.0)
+
+    def estimate_stages(self, kind, stages, features, has_cuda=None):
+        """
+        단계별 예상 시간과 전체 95% 신뢰 구간.
+
+        Returns:
+            dict: total_seconds, interval(하한, 상한), stages(단계 → seconds/source/samples)
+        """
+        device = self.device(has_cuda)
+        total = 0.0
+        variance = 0.0
+        estimates = {}
+        for stage in stages:
+            predicted = self.telemetry.predict(kind, device, stage, features)
+            if predicted is not None:
+                seconds, stage_variance, samples = predicted
+                source = "telemetry"
+            else:
+                seconds = self.prior_seconds(kind, stage, features, device == "cuda")
+                stage_variance = (PRIOR_RELATIVE_STD * seconds) ** 2
+                samples = 0
+                source = "prior"
+            total += seconds
+            # 단계 오차는 서로 독립이라고 보고 분산을 합산
+            variance += stage_variance
+            estimates[stage] = {"seconds": seconds, "source": source, "samples": samples}
+
+        margin = Z_95 * math.sqrt(variance)
+        return {
+            "total_seconds": total,
+            "interval": (max(0.0, total - margin), total + margin),
+            "stages": estimates,
+        }
+
+    def stage_seconds(self, kind, stages, features):
+        """단계 → 예상 초 (작업 ETA 계산용)"""
+        estimate = self.estimate_stages(kind, stages, features)
+        return {stage: entry["seconds"] for stage, entry in estimate["stages"].items()}
+
+    def record(self, kind, features, stage_seconds):
+        """끝난 작업의 단계별 실제 소요 시간 기록"""
+        self.telemetry.record(kind, self.device(), features, stage_seconds)
+
+    def estimate_processing_time(self, image_size, has_cuda=None, audio_sec=10.0, kind="image-music"):
         """
         이는 이미지 크기와 하드웨어 조건을 기반으로 처리 시간을 추정합니다.
-        
+
         Args:
             image_size: tuple, 이미지크기 (width, height)
             has_cuda: bool, CUDA 지원 여부 (None인 경우 자동 검사)
-            
+            audio_sec: float, 생성할 음악 길이 (초)
+            kind: str, 작업 종류 (단계별 기록을 찾을 키)
+
         Returns:
-            dict: 총 시간과 각 단계의 예상 시간
+            dict: 총 시간, 95% 신뢰 구간, 각 단계의 예상 시간
         """
-        if has_cuda is None:
-            has_cuda = torch.cuda.is_available()
-            
-        # 이미지 크기 요소 계산 (큰 이미지일수록 처리가 느림)
-        image_pixels = image_size[0] * image_size[1]
-        size_factor = image_pixels / (1024 * 1024)  # 1MP 대비 요소
-        
-        # 하드웨어와 이미지 크기를 기반으로 각 단계 시간 추정
-        blip_time = 3 * size_factor * (0.5 if has_cuda else 2.0)
-        ocr_time = 2 * size_factor
-        prompt_time = 2
-        music_gen_time = 15 * (0.7 if has_cuda else 2.0)  # 음악 생성 시간은 주로 하드웨어에 따라 달라짐
-        
-        # 총 시간
-        total_time = self.base_time + blip_time + ocr_time + prompt_time + music_gen_time
-        
+        estimate = self.estimate_stages(kind, IMAGE_STEP_NAMES, image_features(image_size, audio_sec), has_cuda)
+        stages = estimate["stages"]
+
+        # 학습된 단계에는 로딩/저장 시간이 이미 포함되어 있으므로 사전 추정치일 때만 기본 시간을 더한다
+        sources = {entry["source"] for entry in stages.values()}
+        base_time = self.base_time if "prior" in sources else 0
+        low, high = estimate["interval"]
+
         return {
-            "total_seconds": round(total_time),
-            "steps": {
-                "image_processing": round(self.base_time),
-                "caption_generation": round(blip_time),
-                "ocr_extraction": round(ocr_time),
-                "prompt_refinement": round(prompt_time),
-                "music_generation": round(music_gen_time)
-            }
+            "total_seconds": round(base_time + estimate["total_seconds"]),
+            "interval_seconds": [round(base_time + low), round(base_time + high)],
+            "steps": dict(
+                {"image_processing": round(base_time)},
+                **{IMAGE_STEP_NAMES[stage]: round(entry["seconds"]) for stage, entry in stages.items()}
+            ),
+            "source": sources.pop() if len(sources) == 1 else "mixed",
         }
+
+    def estimate_video_time(self, video_info, size_bytes, stages, has_cuda=None, max_frames=None):
+        """
+        비디오 메타데이터(길이, 해상도, 프레임 수)와 파일 크기로 처리 시간을 추정합니다.
+
+        Returns:
+            dict: 총 시간, 95% 신뢰 구간, 각 단계의 예상 시간
+        """
+        estimate = self.estimate_stages("video", stages, video_features(video_info, size_bytes, max_frames=max_frames), has_cuda)
+        low, high = estimate["interval"]
+        return {
+            "total_seconds": round(estimate["total_seconds"]),
+            "interval_seconds": [round(low), round(high)],
+            "steps": {stage: round(entry["seconds"]) for stage, entry in estimate["stages"].items()},
+        }
+
+    def stats(self):
+        return self.telemetry.stats()
@@ -0,0 +1,50 @@
+import hashlib
+import os
+import aiofiles
+from fastapi import UploadFile
+
+# 한 번에 읽고 쓰는 청크 크기
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """업로드 크기가 제한을 넘은 경우"""
+
+    def __init__(self, max_bytes):
+        super().__init__(f"File size must be {max_bytes // (1024 * 1024)}MB or smaller")
+        self.max_bytes = max_bytes
+
+
+async def ingest_upload(file: UploadFile, dest_path: str, max_bytes=None) -> dict:
+    """
+    업로드 파일을 청크 단위로 디스크에 스트리밍 저장한다.
+    파일 전체를 메모리에 올리지 않고, 쓰는 동안 sha256 해시를 함께 계산하며,
+    크기 제한을 넘는 순간 중단하고 부분 파일을 삭제한다.
+
+    Returns:
+        {"path", "size", "sha256"}
+    """
+    digest = hashlib.sha256()
+    size = 0
+
+    try:
+        async with aiofiles.open(dest_path, "wb") as out:
+            while True:
+                chunk = await file.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+
+                size += len(chunk)
+                if max_bytes is not None and size > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+
+                digest.update(chunk)
+                await out.write(chunk)
+    except BaseException:
+        if os.path.exists(dest_path):
+            os.unlink(dest_path)
+        raise
+    finally:
+        await file.close()
+
+    return {"path": dest_path, "size": size, "sha256": digest.hexdigest()}
@@ -0,0 +1,105 @@
+import threading
+import time
+from collections import OrderedDict
+
+COMPONENT_PENDING = "pending"
+COMPONENT_WARMING = "warming"
+COMPONENT_READY = "ready"
+COMPONENT_FAILED = "failed"
+
+
+def warm_up_blip(registry):
+    """BLIP 로드 + 빈 이미지로 더미 캡셔닝 1회"""
+    import torch
+    from PIL import Image
+
+    processor, model = registry.get_blip()
+    inputs = processor(images=Image.new("RGB", (64, 64)), return_tensors="pt").to(registry.device)
+    with torch.no_grad():
+        model.generate(**inputs, max_length=5)
+
+
+def warm_up_musicgen(registry):
+    """MusicGen 로드 + 짧은 더미 생성 1회"""
+    import torch
+
+    processor, model = registry.get_musicgen()
+    inputs = processor(text=["warmup"], padding=True, return_tensors="pt").to(registry.device)
+    with torch.no_grad():
+        model.generate(**inputs, max_new_tokens=4, do_sample=False)
+
+
+class _Component:
+    def __init__(self, name, init_fn, required):
+        self.name = name
+        self.init_fn = init_fn
+        self.required = required
+        self.status = COMPONENT_PENDING
+        self.value = None
+        self.error = None
+        self.seconds = None
+
+    def to_dict(self):
+        return {
+            "status": self.status,
+            "required": self.required,
+            "seconds": round(self.seconds, 2) if self.seconds is not None else None,
+            "error": self.error,
+        }
+
+
+class WarmupManager:
+    """
+    서버가 요청을 받기 시작한 뒤 백그라운드 스레드에서 구성 요소(챗봇, 모델 등)를 차례로 초기화하고
+    구성 요소별 준비 상태를 추적한다. 필수 구성 요소가 모두 준비되어야 is_ready()가 True가 된다.
+    """
+
+    def __init__(self):
+        self._components = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def register(self, name, init_fn, required=True):
+        """init_fn의 반환값은 get(name)으로 꺼낼 수 있다"""
+        self._components[name] = _Component(name, init_fn, required)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="warmup", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        for component in self._components.values():
+            with self._lock:
+                component.status = COMPONENT_WARMING
+            started_at = time.monotonic()
+            try:
+                value = component.init_fn()
+                with self._lock:
+                    component.value = value
+                    component.seconds = time.monotonic() - started_at
+                    component.status = COMPONENT_READY
+                print(f"[INFO] Warmup: {component.name} ready ({component.seconds:.1f}s)")
+            except Exception as e:
+                with self._lock:
+                    component.error = str(e)
+                    component.seconds = time.monotonic() - started_at
+                    component.status = COMPONENT_FAILED
+                print(f"[ERROR] Warmup: {component.name} failed: {e}")
+
+    def get(self, name):
+        """준비된 구성 요소의 초기화 결과 (아직 준비되지 않았으면 None)"""
+        component = self._components[name]
+        return component.value if component.status == COMPONENT_READY else None
+
+    def is_ready(self, name=None):
+        with self._lock:
+            if name is not None:
+                return self._components[name].status == COMPONENT_READY
+            return all(c.status == COMPONENT_READY for c in self._components.values() if c.required)
+
+    def status(self):
+        with self._lock:
+            components = {name: c.to_dict() for name, c in self._components.items()}
+        return {"ready": self.is_ready(), "components": components}
@@ -2,34 +2,48 @@
 import os
 os.environ["KMP_DUPLICATE_LIB_OK"] = "TRUE"
 
+import asyncio
+import json
 import traceback
-from fastapi import FastAPI, UploadFile, File, HTTPException, Body, Depends
+from fastapi import FastAPI, UploadFile, File, HTTPException, Body, Depends, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import StreamingResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.concurrency import run_in_threadpool
 import shutil
 from typing import List, Dict, Any, Optional
 import uuid
 import pathlib
 from tempfile import NamedTemporaryFile, TemporaryDirectory
 import tempfile
-from moviepy.editor import VideoFileClip, AudioFileClip
 from tempfile import NamedTemporaryFile, TemporaryDirectory
 import tempfile
 from pydantic import BaseModel
-from runner import run_pipeline
+from runner import run_pipeline, VIDEO_STAGES, MAX_FRAMES
 
 # 챗봇 기능 가져오기
-from chatbot import get_chatbot, process_message
+from chatbot import get_chatbot, process_message, stream_message
 
 # 이미지 기반 음악 생성 모듈 가져오기
-from logic.image_music_generator import ImageMusicGenerator
-from logic.time_estimator import ProcessingTimeEstimator
+from logic.image_music_generator import ImageMusicGenerator, IMAGE_MUSIC_STAGES, IMAGE_MUSIC_DURATION
+from logic.time_estimator import ProcessingTimeEstimator, image_features, video_features
+from logic.result_cache import ResultCache
+from logic.model_registry import MUSICGEN_MODEL_NAME, get_model_registry
+from logic.file_response import file_response
+from logic.upload_ingest import ingest_upload, UploadTooLargeError
+from logic.music_batcher import get_music_scheduler
+from logic.job_manager import Job, JobManager, JobQueueFullError, JOB_FAILED, JOB_SUCCEEDED
+from logic.inference_pool import (
+    reserve_inference_pool, start_inference_pool, shutdown_inference_pool, get_inference_pool
+)
+from logic.warmup import WarmupManager, warm_up_blip, warm_up_musicgen
+from logic.semantic_cache import get_response_cache
+from logic.llm_client import get_llm_client
 from PIL import Image
 
 app = FastAPI()
 
-# 시간 추정기 초기화
+# 시간 추정기 초기화 (작업별 단계 소요 시간 기록으로 학습한 모델 사용, results/cache/telemetry)
 time_estimator = ProcessingTimeEstimator()
 
 # CORS 설정
@@ -51,6 +65,62 @@ OUTPUT_DIR = BACKEND_DIR / "results"
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 os.makedirs(OUTPUT_DIR, exist_ok=True)
 
+# 업로드 내용 기반 결과 캐시 (같은 파일 재업로드 시 파이프라인 재실행 방지)
+result_cache = ResultCache(OUTPUT_DIR / "cache")
+
+# 캐시 키에 포함되는 생성 파라미터 (값이 바뀌면 이전 결과는 재사용되지 않음)
+IMAGE_MUSIC_PARAMS = {"pipeline": "image-music", "duration": IMAGE_MUSIC_DURATION, "musicgen": MUSICGEN_MODEL_NAME}
+VIDEO_PARAMS = {"pipeline": "video", "musicgen": MUSICGEN_MODEL_NAME}
+
+# 무거운 파이프라인은 이벤트 루프 밖의 제한된 작업 풀에서 실행 (JOB_MAX_WORKERS)
+# 끝난 작업의 단계별 소요 시간은 time_estimator에 기록되어 ETA/예상 시간에 반영된다
+job_manager = JobManager(estimator=time_estimator)
+
+# 워커 풀 워밍업 대기 한도 (초기화 중 죽은 워커 때문에 계속 warming 상태로 남지 않도록)
+WORKER_WARMUP_TIMEOUT_SEC = float(os.getenv("AURA_WORKER_WARMUP_TIMEOUT_SEC", "600"))
+
+def warm_up_model(warm_up):
+    """
+    워커 풀이 켜져 있으면 워커들의 워밍업 완료를 기다리고, 아니면 현재 프로세스에서 더미 추론.
+    워커 워밍업이 실패하면 풀을 비활성화하고 현재 프로세스에서 워밍업한다 (시간 초과는 실패로 남긴다)
+    """
+    pool = get_inference_pool()
+    if pool is not None:
+        try:
+            pool.wait_warmed(timeout=WORKER_WARMUP_TIMEOUT_SEC)
+            return
+        except RuntimeError as e:
+            pool.mark_unhealthy(e)
+    warm_up(get_model_registry())
+
+def start_pool_or_fallback():
+    """
+    AURA_INFERENCE_WORKERS > 0 이면 모델을 한 번 로드한 뒤 워커 프로세스를 fork (가중치 copy-on-write 공유).
+    실패하면 예외를 기록하고 현재 프로세스 추론으로 동작한다 (get_inference_pool()이 None)
+    """
+    pool = start_inference_pool()
+    return {"workers": pool.num_workers if pool else 0}
+
+# 챗봇 초기화(지식 베이스 임베딩)와 모델 로드는 서버가 요청을 받기 시작한 뒤 백그라운드에서 진행
+# 준비 상태는 /ready 로 확인 (로드 밸런서는 ready=true 인 인스턴스로만 트래픽을 보낸다)
+# 워커 풀 시작(fork)은 추론을 하는 다른 구성 요소보다 먼저, 같은 워밍업 스레드에서 실행한다
+warmup = WarmupManager()
+warmup.register("inference_pool", start_pool_or_fallback, required=False)
+warmup.register("chatbot", get_chatbot)
+warmup.register("blip", lambda: warm_up_model(warm_up_blip))
+warmup.register("musicgen", lambda: warm_up_model(warm_up_musicgen))
+warmup.register("refiner", lambda: get_model_registry().get_refiner(), required=False)
+
+@app.on_event("startup")
+def start_background_init():
+    # 워커 풀 시작이 끝날 때까지 작업 스레드의 추론은 기다리게 한 뒤(fork 전 부모 추론 방지) 백그라운드 워밍업 시작
+    reserve_inference_pool()
+    warmup.start()
+
+@app.on_event("shutdown")
+def stop_inference_workers():
+    shutdown_inference_pool()
+
 BASE_DIR = pathlib.Path(__file__).parent.parent
 STATIC_DIR = BASE_DIR / "frontend" / "public"
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
@@ -59,27 +129,40 @@ app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 def read_root():
     return {"message": "AURA API is running"}
 
+@app.get("/ready")
+def readiness():
+    """구성 요소별 준비 상태 (필수 구성 요소가 모두 준비되면 200, 아니면 503)"""
+    status = warmup.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
 # 채팅 메시지 모델
 class ChatMessage(BaseModel):
     message: str
+    # 대화 세션 ID (없으면 새로 발급해 응답에 포함, 이후 요청에서 다시 보내면 대화가 이어진다)
+    session_id: Optional[str] = None
     image_url: Optional[str] = None
     audio_url: Optional[str] = None
     video_url: Optional[str] = None
 
-# 챗봇 및 RAG QA 체인 초기화
-chatbot, qa_chain = get_chatbot()
-
 @app.post("/chat/")
 async def chat(message: ChatMessage):
     """
     Process a chat message using LangChain with Google Gemini
     """
+    chains = warmup.get("chatbot")
+    if chains is None:
+        raise HTTPException(status_code=503, detail="Chatbot is warming up", headers={"Retry-After": "5"})
+    sessions, qa_chain = chains
+    session_id = message.session_id or uuid.uuid4().hex
+
     try:
-        # LangChain과 RAG로 메시지 처리
-        response = process_message(
-            conversation=chatbot,
+        # LangChain과 RAG로 메시지 처리 (LLM 호출은 기한이 있는 블로킹 호출이므로 스레드풀에서)
+        response = await run_in_threadpool(
+            process_message,
+            sessions=sessions,
             qa_chain=qa_chain,
             message=message.message,
+            session_id=session_id,
             image_url=message.image_url,
             video_url=message.video_url,
             audio_url=message.audio_url
@@ -87,11 +170,68 @@ async def chat(message: ChatMessage):
         
         return {
             "response": response,
+            "session_id": session_id,
             "status": "success"
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing chat: {str(e)}")
 
+def sse_event(data: Dict[str, Any], event: Optional[str] = None) -> str:
+    """server-sent event 한 건 (data는 JSON 한 줄)"""
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+@app.post("/chat/stream/")
+async def chat_stream(message: ChatMessage):
+    """
+    /chat/의 스트리밍 버전. 응답 조각을 생성되는 대로 server-sent events로 보낸다.
+    이벤트 순서: session {session_id} → (data {delta})* → done {response}
+    """
+    chains = warmup.get("chatbot")
+    if chains is None:
+        raise HTTPException(status_code=503, detail="Chatbot is warming up", headers={"Retry-After": "5"})
+    sessions, qa_chain = chains
+    session_id = message.session_id or uuid.uuid4().hex
+
+    async def events():
+        yield sse_event({"session_id": session_id}, event="session")
+        # LLM 스트리밍은 블로킹 호출이므로 조각마다 스레드풀에서 가져온다
+        chunks = stream_message(sessions, qa_chain, message.message, session_id)
+        parts = []
+        try:
+            while True:
+                chunk = await run_in_threadpool(next, chunks, None)
+                if chunk is None:
+                    break
+                parts.append(chunk)
+                yield sse_event({"delta": chunk})
+            yield sse_event({"response": "".join(parts)}, event="done")
+        finally:
+            # 클라이언트가 끊기면 제너레이터를 닫아 업스트림 생성을 중단한다.
+            # 취소된 async 제너레이터에서도 확실히 실행되도록 await 없이 바로 닫는다 (run_in_threadpool은
+            # 취소되어도 실행 중인 next()가 끝난 뒤 돌아오므로 여기서 제너레이터가 실행 중일 수 없다)
+            chunks.close()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# 업로드 크기 제한 (100MB)
+MAX_UPLOAD_BYTES = 100 * 1024 * 1024
+
+async def save_upload(file: UploadFile, dest_path: str) -> Dict[str, Any]:
+    """
+    공용 업로드 저장: 청크 단위로 비동기 저장하면서 크기 제한 확인 + sha256 계산
+    """
+    try:
+        return await ingest_upload(file, dest_path, max_bytes=MAX_UPLOAD_BYTES)
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
+
 # 파일의 전체 URL을 가져오는 유틸리티 함수
 def get_file_url(filename: str) -> str:
     base_url = "http://localhost:8001"
@@ -110,8 +250,7 @@ async def upload_multiple_images(files: List[UploadFile] = File(...)):
         file_path = str(UPLOAD_DIR / unique_filename)
 
         try:
-            with open(file_path, "wb") as buffer:
-                shutil.copyfileobj(file.file, buffer)
+            await save_upload(file, file_path)
 
             result.append({
                 "filename": unique_filename,
@@ -120,10 +259,8 @@ async def upload_multiple_images(files: List[UploadFile] = File(...)):
                 "file_path": file_path,
                 "url": get_file_url(unique_filename)
             })
-        except Exception:
+        except HTTPException:
             pass
-        finally:
-            file.file.close()
 
     return result
 
@@ -148,13 +285,7 @@ async def upload_image(file: UploadFile = File(...)):
     file_path = os.path.join(UPLOAD_DIR, unique_filename)
     
     # 파일 저장
-    try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
-    finally:
-        file.file.close()
+    await save_upload(file, file_path)
     
     return {
         "filename": unique_filename,
@@ -174,13 +305,7 @@ async def upload_audio(file: UploadFile = File(...)):
     unique_filename = f"{uuid.uuid4()}{file_extension}"
     file_path = os.path.join(UPLOAD_DIR, unique_filename)
 
-    try:
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error saving file: {str(e)}")
-    finally:
-        file.file.close()
+    await save_upload(file, file_path)
 
     return {
         "filename": unique_filename,
@@ -201,94 +326,155 @@ async def estimate_video_processing_time(file: UploadFile = File(...)):
 
     try:
         print(f"[INFO] 开始视频处理时间预测请求")
-        # 비디오 파일 크기 가져오기
-        file.file.seek(0, os.SEEK_END)
-        size = file.file.tell()
-        file.file.seek(0)
-
-        # 처리 시간 예측 - 비디오 크기 기반 추정
-        # MB당 2초의 처리 시간 가정
-        time_estimate = int((size / (1024 * 1024)) * 2)
-        # 최소 처리 시간 10초 보장
-        time_estimate = max(10, time_estimate)
-        print(f"[INFO] 视频处理时间预测结果: {time_estimate}秒")
-        
-        return {"estimated_time": time_estimate}
+        # 메타데이터(길이, 해상도, 프레임 수)를 읽기 위해 임시 파일로 스트리밍 저장 (크기 제한 적용)
+        temp_file_path = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4').name
+        try:
+            upload = await save_upload(file, temp_file_path)
+            size = upload["size"]
+            video_info = await run_in_threadpool(probe_video, temp_file_path)
+        finally:
+            if os.path.exists(temp_file_path):
+                os.unlink(temp_file_path)
+
+        if video_info is None:
+            # 메타데이터를 읽을 수 없으면 크기 기반 추정 (MB당 2초, 최소 10초)
+            time_estimate = {"total_seconds": max(10, int((size / (1024 * 1024)) * 2))}
+        else:
+            time_estimate = time_estimator.estimate_video_time(video_info, size, VIDEO_STAGES, max_frames=MAX_FRAMES)
+
+        # 클라이언트 카운트다운은 업로드 시점부터이므로 앞선 작업의 예상 대기 시간을 포함
+        queue_wait = round(job_manager.queue_wait_seconds())
+        time_estimate["queue_wait_seconds"] = queue_wait
+        time_estimate["estimated_time"] = time_estimate["total_seconds"] + queue_wait
+        print(f"[INFO] 视频处理时间预测结果: {time_estimate}")
+
+        return time_estimate
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@app.post("/upload-video/")
-async def upload_video(file: UploadFile = File(...)):
+def probe_video(video_path: str) -> Optional[Dict[str, Any]]:
+    """비디오 메타데이터 (읽을 수 없으면 None)"""
+    from logic.frame_extractor import FrameExtractor
+
+    try:
+        return FrameExtractor().probe(video_path)
+    except Exception as e:
+        print(f"[WARNING] Failed to probe video {video_path}: {e}")
+        return None
+
+def video_job_features(video_path: str, size: int) -> Optional[Dict[str, float]]:
+    """비디오 작업의 처리 시간 추정/기록용 입력 특징"""
+    video_info = probe_video(video_path)
+    return video_features(video_info, size, max_frames=MAX_FRAMES) if video_info else None
+
+def image_job_features(image_path: str) -> Optional[Dict[str, float]]:
+    """이미지 → 음악 작업의 처리 시간 추정/기록용 입력 특징"""
+    try:
+        with Image.open(image_path) as img:
+            return image_features(img.size, IMAGE_MUSIC_DURATION)
+    except Exception as e:
+        print(f"[WARNING] Failed to read image size {image_path}: {e}")
+        return None
+
+def process_video_job(report, video_path: str, content_hash: str) -> Dict[str, Any]:
     """
-    Upload a video file, process it through the AURA pipeline
+    비디오 작업 본체 (작업 스레드에서 실행). 캐시에 없으면 AURA 파이프라인을 실행한다.
     """
+    try:
+        def compute(dest_path):
+            # Create temporary directory for processing
+            with TemporaryDirectory() as tmp_dir:
+                # Process video through AURA pipeline (결과는 캐시 위치에 바로 기록)
+                final_result = run_pipeline(video_path, tmp_dir, progress=report, result_path=dest_path)
+                print(f"[INFO] Video processing complete. Result at: {final_result}")
+                if not os.path.exists(final_result):
+                    raise FileNotFoundError(f"Processed video file not found: {final_result}")
+                return final_result
+
+        # 같은 영상 + 같은 파라미터면 캐시된 결과 반환, 동시 요청은 하나의 계산을 공유
+        cache_key = result_cache.make_key(content_hash, VIDEO_PARAMS)
+        result_path, cache_hit = result_cache.get_or_compute(cache_key, compute, ".mp4", VIDEO_PARAMS)
+        print(f"[INFO] Video result ({'cached' if cache_hit else 'new'}): {result_path}")
+
+        return {
+            "path": result_path,
+            "media_type": "video/mp4",
+            "filename": f"aura_video_{cache_key[:16]}.mp4",
+            "cached": cache_hit,
+        }
+    finally:
+        # 업로드 임시 파일 정리
+        if os.path.exists(video_path):
+            try:
+                os.unlink(video_path)
+            except:
+                pass
+
+def result_response(request: Request, result: Dict[str, Any]) -> Response:
+    """작업 결과 파일을 Range/조건부 요청을 지원하는 응답으로 변환 (복사 없이 디스크에서 전송)"""
+    if result["media_type"].startswith("video/"):
+        return file_response(
+            request,
+            result["path"],
+            result["media_type"],
+            headers={
+                "Cache-Control": "no-cache",
+                "Access-Control-Allow-Origin": "*"
+            }
+        )
+
+    return file_response(request, result["path"], result["media_type"], filename=result["filename"])
+
+async def save_video_upload(file: UploadFile) -> Dict[str, Any]:
+    """업로드된 비디오를 임시 파일로 스트리밍 저장 ({"path", "size", "sha256"} 반환)"""
     if not file.content_type.startswith("video/"):
         raise HTTPException(status_code=400, detail="File must be a video")
-    
-    # 파일 크기 확인
-    content = await file.read()
-    if len(content) > 100 * 1024 * 1024:  # 100MB 제한
-        raise HTTPException(status_code=400, detail="Video file size must be 100MB or smaller")
 
-    temp_video_path = None
-    temp_result = None
-    final_result = None
+    temp_video_path = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4').name
+    # 크기 제한(100MB)은 저장 도중 초과 즉시 확인
+    upload = await save_upload(file, temp_video_path)
+    print(f"[INFO] Video saved to temp path: {temp_video_path} ({upload['size']} bytes)")
+    return upload
+
+def submit_job(kind: str, stages: List[str], fn, *args, features=None) -> Job:
+    try:
+        return job_manager.submit(kind, stages, fn, *args, features=features)
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
 
+async def submit_video_upload(file: UploadFile) -> Job:
+    upload = await save_video_upload(file)
     try:
-        # 업로드된 파일 저장
-        temp_video_path = tempfile.NamedTemporaryFile(delete=False, suffix='.mp4').name
-        with open(temp_video_path, "wb") as buffer:
-            buffer.write(content)
-
-        print(f"[INFO] Video saved to temp path: {temp_video_path}")
-
-        # Create temporary directory for processing
-        with TemporaryDirectory() as tmp_dir:
-            # Process video through AURA pipeline
-            temp_result, final_result = run_pipeline(temp_video_path, tmp_dir)
-            print(f"[INFO] Video processing complete. Result at: {final_result}")
-
-            # Return the final processed video with audio
-            if os.path.exists(final_result):
-                return StreamingResponse(
-                    open(final_result, "rb"),
-                    media_type="video/mp4",
-                    headers={
-                        "Content-Type": "video/mp4",
-                        "Accept-Ranges": "bytes",
-                        "Cache-Control": "no-cache",
-                        "Access-Control-Allow-Origin": "*"
-                    }
-                )
-            else:
-                raise FileNotFoundError(f"Processed video file not found: {final_result}")
+        features = await run_in_threadpool(video_job_features, upload["path"], upload["size"])
+        return submit_job("video", VIDEO_STAGES, process_video_job, upload["path"], upload["sha256"],
+                          features=features)
+    except HTTPException:
+        os.unlink(upload["path"])
+        raise
+
+@app.post("/upload-video/")
+async def upload_video(request: Request, file: UploadFile = File(...)):
+    """
+    Upload a video file, process it through the AURA pipeline
+    """
+    job = await submit_video_upload(file)
+
+    try:
+        # 작업 스레드풀에서 처리하는 동안 이벤트 루프는 다른 요청을 계속 처리
+        result = await asyncio.wrap_future(job.future)
+
+        # Return the final processed video with audio
+        return result_response(request, result)
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[ERROR] Video processing failed: {str(e)}")
         print(traceback.format_exc())
-        
-        # Cleanup on error
-        if temp_video_path and os.path.exists(temp_video_path):
-            try:
-                os.unlink(temp_video_path)
-            except:
-                pass
-                
-        if temp_result and os.path.exists(temp_result):
-            try:
-                os.unlink(temp_result)
-            except:
-                pass
-                
-        if final_result and os.path.exists(final_result):
-            try:
-                os.unlink(final_result)
-            except:
-                pass
-                
         raise HTTPException(status_code=500, detail=f"Failed to process video: {str(e)}")
-
             
 # Make uploads directory accessible via HTTP
 app.mount("/uploads", StaticFiles(directory=str(UPLOAD_DIR)), name="uploads")
@@ -317,8 +503,12 @@ async def estimate_processing_time(file: UploadFile = File(...)):
         finally:
             os.unlink(temp_file_path)
 
-        # 预测处理时间
-        time_estimate = time_estimator.estimate_processing_time(image_size)
+        # 预测处理时间 (클라이언트 카운트다운은 업로드 시점부터이므로 앞선 작업의 예상 대기 시간을 포함)
+        time_estimate = time_estimator.estimate_processing_time(image_size, audio_sec=IMAGE_MUSIC_DURATION)
+        queue_wait = round(job_manager.queue_wait_seconds())
+        time_estimate["queue_wait_seconds"] = queue_wait
+        time_estimate["total_seconds"] += queue_wait
+        time_estimate["interval_seconds"] = [seconds + queue_wait for seconds in time_estimate["interval_seconds"]]
         print(f"[INFO] 时间预测结果: {time_estimate}")
         return time_estimate
 
@@ -327,11 +517,8 @@ async def estimate_processing_time(file: UploadFile = File(...)):
     finally:
         file.file.seek(0)  # 重置文件指针，以便后续处理
 
-@app.post("/upload-image-music/")
-async def upload_image_music(file: UploadFile = File(...)):
-    """
-    이미지 파일을 업로드 받아 음악으로 변환하여 반환합니다.
-    """
+async def save_image_music_upload(file: UploadFile):
+    """업로드 이미지를 작업용 임시 디렉토리에 저장하고 (image_path, temp_dir, sha256) 반환"""
     if not file.content_type.startswith("image/"):
         raise HTTPException(status_code=400, detail="이미지 파일만 가능합니다.")
 
@@ -340,24 +527,28 @@ async def upload_image_music(file: UploadFile = File(...)):
     
     # 작업용 임시 디렉토리 생성
     temp_dir = tempfile.mkdtemp()
-    
-    try:
-        print(f"[INFO] Processing upload-image-music request")
-        print(f"[INFO] Temporary directory: {temp_dir}")
+    print(f"[INFO] Temporary directory: {temp_dir}")
+
+    # 1. 이미지 파일 저장 (저장하면서 내용 해시 계산)
+    image_path = os.path.join(temp_dir, f"uploaded{file_ext}")
+    upload = await save_upload(file, image_path)
         
-        # 1. 이미지 파일 저장
-        image_path = os.path.join(temp_dir, f"uploaded{file_ext}")
-        with open(image_path, "wb") as f:
-            shutil.copyfileobj(file.file, f)
-            
-        print(f"[INFO] Image saved to: {image_path}")
+    print(f"[INFO] Image saved to: {image_path}")
+    return image_path, temp_dir, upload["sha256"]
 
-        # 2. 이미지 → 음악 생성
-        print(f"[INFO] Initializing ImageMusicGenerator")
+def process_image_music_job(report, image_path: str, temp_dir: str, content_hash: str) -> Dict[str, Any]:
+    """
+    이미지 → 음악 작업 본체 (작업 스레드에서 실행). 캐시에 없으면 음악을 생성한다.
+    """
+    def compute(dest_path):
+        # 2. 이미지 → 음악 생성 (결과는 캐시 위치에 바로 기록)
+        print(f"[INFO] Initializing ImageMusicGenerator (shared models)")
         music_generator = ImageMusicGenerator()
         
         print(f"[INFO] Generating music from image")
-        music_path = music_generator.generate_music_from_image(image_path, temp_dir)
+        music_path = music_generator.generate_music_from_image(
+            image_path, temp_dir, progress=report, output_path=dest_path
+        )
         
         print(f"[INFO] Music generated successfully: {music_path}")
         
@@ -370,33 +561,185 @@ async def upload_image_music(file: UploadFile = File(...)):
         
         if filesize == 0:
             raise ValueError("Generated music file is empty")
+        return music_path
 
-        # 4. 영구 저장용 파일 생성
-        output_filename = f"generated_music_{uuid.uuid4()}.wav"
-        permanent_path = str(OUTPUT_DIR / output_filename)
-        
-        # 임시 파일을 영구 저장 위치로 복사
-        shutil.copy2(music_path, permanent_path)
-        print(f"[INFO] Music file copied to permanent location: {permanent_path}")
-
-        # 5. StreamingResponse로 반환 (VideoAPI와 동일한 방식)
-        return StreamingResponse(
-            open(permanent_path, "rb"),
-            media_type="audio/wav",
-            headers={
-                "Content-Disposition": f"attachment; filename={output_filename}"
-            }
-        )
+    try:
+        # 4. 캐시 조회 또는 생성 (결과는 results/cache 아래에 영구 저장)
+        cache_key = result_cache.make_key(content_hash, IMAGE_MUSIC_PARAMS)
+        permanent_path, cache_hit = result_cache.get_or_compute(cache_key, compute, ".wav", IMAGE_MUSIC_PARAMS)
+        print(f"[INFO] Music file ({'cached' if cache_hit else 'new'}): {permanent_path}")
+
+        return {
+            "path": permanent_path,
+            "media_type": "audio/wav",
+            "filename": f"generated_music_{cache_key[:16]}.wav",
+            "cached": cache_hit,
+        }
+    finally:
+        # 임시 디렉토리는 남겨두어 디버깅에 사용
+        print(f"[INFO] Temporary files remain in {temp_dir} for debugging")
+
+def submit_image_music(image_path: str, temp_dir: str, content_hash: str) -> Job:
+    try:
+        return submit_job("image-music", IMAGE_MUSIC_STAGES, process_image_music_job, image_path, temp_dir, content_hash,
+                          features=image_job_features(image_path))
+    except HTTPException:
+        # 작업이 접수되지 않았으면(429) 업로드 이미지와 임시 디렉토리는 아무도 쓰지 않는다
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+@app.post("/upload-image-music/")
+async def upload_image_music(request: Request, file: UploadFile = File(...)):
+    """
+    이미지 파일을 업로드 받아 음악으로 변환하여 반환합니다.
+    """
+    print(f"[INFO] Processing upload-image-music request")
+    image_path, temp_dir, content_hash = await save_image_music_upload(file)
+
+    try:
+        job = submit_image_music(image_path, temp_dir, content_hash)
+        result = await asyncio.wrap_future(job.future)
+
+        # 5. 파일 응답으로 반환 (VideoAPI와 동일한 방식)
+        return result_response(request, result)
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[ERROR] Upload-image-music failed: {str(e)}")
         print(traceback.format_exc())
         raise HTTPException(status_code=500, detail=f"이미지 음악 생성 실패: {str(e)}")
-    finally:
-        file.file.close()
-        
-        # 임시 디렉토리는 남겨두어 디버깅에 사용
-        print(f"[INFO] Temporary files remain in {temp_dir} for debugging")
+
+def stream_image_music_job(report, image_path: str, temp_dir: str, music_generator, streamer) -> Dict[str, Any]:
+    """
+    이미지 → 프롬프트 후 생성 중인 오디오를 streamer로 흘려보내는 작업 (작업 스레드에서 실행)
+    클라이언트 연결이 끊기면(streamer.cancel) 생성을 중단한다.
+    """
+    try:
+        pool = get_inference_pool()
+        if pool is not None:
+            report("caption")
+            prompt = pool.build_image_prompt(image_path, report)
+        else:
+            prompt = ImageMusicGenerator().build_prompt(image_path, report)
+    except Exception as e:
+        streamer.fail(e)
+        raise
+
+    if not streamer.cancelled:
+        report("generate_music")
+        music_generator.generate_streaming(prompt, IMAGE_MUSIC_DURATION, streamer)
+    # 중간에 취소된 작업은 처리 시간 기록에서 제외
+    return {"cancelled": streamer.cancelled}
+
+@app.post("/stream-image-music/")
+async def stream_image_music(request: Request, file: UploadFile = File(...)):
+    """
+    이미지 파일을 업로드 받아 생성 중인 음악을 청크 단위 WAV 스트림으로 반환합니다.
+    전체 생성이 끝나기 전에 첫 1초 분량부터 재생할 수 있습니다.
+    """
+    from logic.music_generator import MusicGenerator
+    from logic.music_streamer import wav_stream_header, to_pcm16
+
+    image_path, temp_dir, _ = await save_image_music_upload(file)
+
+    try:
+        # 모델은 레지스트리에서 공유 (최초 1회 로드는 이벤트 루프 밖에서)
+        music_generator = await run_in_threadpool(MusicGenerator)
+        streamer = music_generator.create_streamer(chunk_sec=1.0)
+        submit_job("image-music-stream", IMAGE_MUSIC_STAGES, stream_image_music_job,
+                   image_path, temp_dir, music_generator, streamer, features=image_job_features(image_path))
+    except BaseException:
+        # 작업이 접수되지 않았으면(예: 429) 업로드 임시 디렉토리는 아무도 쓰지 않는다
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+
+    async def wav_chunks():
+        finished = False
+        try:
+            yield wav_stream_header(music_generator.sampling_rate)
+            chunks = iter(streamer)
+            while not await request.is_disconnected():
+                try:
+                    chunk = await run_in_threadpool(next, chunks, None)
+                except Exception as e:
+                    # 헤더를 이미 보냈으므로 스트림을 끊는 것 외에는 알릴 방법이 없다
+                    print(f"[ERROR] Streaming music generation failed: {str(e)}")
+                    raise
+                if chunk is None:
+                    finished = True
+                    break
+                yield to_pcm16(chunk)
+        finally:
+            # 클라이언트가 끊기면 아무도 읽지 않는 구간을 더 생성하지 않도록 작업에 알린다
+            if not finished:
+                streamer.cancel()
+
+    return StreamingResponse(
+        wav_chunks(),
+        media_type="audio/wav",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+@app.get("/metrics/musicgen")
+async def musicgen_metrics():
+    """MusicGen 마이크로 배칭 지표 (배치 크기, 대기 시간)"""
+    return get_music_scheduler().metrics()
+
+@app.get("/metrics/estimator")
+async def estimator_metrics():
+    """처리 시간 추정 모델 지표 (작업 종류/장치별 표본 수, 단계별 잔차, 현재 예상 대기 시간)"""
+    return dict(time_estimator.stats(), jobs=job_manager.stats())
+
+@app.get("/metrics/llm")
+async def llm_metrics():
+    """공유 Gemini 클라이언트 지표 (모델별 p95 지연, hedge 요청 수, 기한 초과 수)"""
+    try:
+        return get_llm_client().stats()
+    except ValueError as e:
+        return {"enabled": False, "error": str(e)}
+
+@app.get("/metrics/chat-cache")
+async def chat_cache_metrics():
+    """챗봇 의미 기반 응답 캐시 지표 (적중률, 언어별 항목 수)"""
+    response_cache = get_response_cache()
+    return response_cache.stats() if response_cache else {"enabled": False}
+
+# ===== 비동기 작업 API =====
+# 제출 즉시 job_id를 반환하고, 상태/단계 진행률 조회 후 완료되면 결과를 받아간다.
+
+@app.post("/jobs/video/", status_code=202)
+async def submit_video_job(file: UploadFile = File(...)):
+    """비디오 처리 작업 제출"""
+    job = await submit_video_upload(file)
+    return job_manager.describe(job)
+
+@app.post("/jobs/image-music/", status_code=202)
+async def submit_image_music_job(file: UploadFile = File(...)):
+    """이미지 → 음악 작업 제출"""
+    image_path, temp_dir, content_hash = await save_image_music_upload(file)
+    job = submit_image_music(image_path, temp_dir, content_hash)
+    return job_manager.describe(job)
+
+@app.get("/jobs/{job_id}")
+async def get_job_status(job_id: str):
+    """작업 상태와 단계 진행률 조회"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_manager.describe(job)
+
+@app.get("/jobs/{job_id}/result")
+async def get_job_result(job_id: str, request: Request):
+    """완료된 작업의 결과 파일 반환"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    if job.status == JOB_FAILED:
+        raise HTTPException(status_code=500, detail=f"Job failed: {job.error}")
+    if job.status != JOB_SUCCEEDED:
+        raise HTTPException(status_code=409, detail=f"Job is not finished yet (status: {job.status})")
+    return result_response(request, job.result)
 
 
 if __name__ == "__main__":
@@ -1,26 +1,87 @@
 import os
-from logic.frame_extractor import FrameExtractor
-from logic.blip_emotion_analyzer import BLIPEmotionAnalyzer
-from logic.llm_prompt_refiner import LLMPromptRefiner
-from logic.music_generator import MusicGenerator
-from moviepy.editor import VideoFileClip, AudioFileClip
-import numpy as np
+import subprocess
+from logic.music_batcher import get_music_scheduler
+from logic.model_registry import get_model_registry
+from logic.inference_pool import get_inference_pool
 import soundfile as sf
 
-def combine_video_audio(video_path, audio_path, output_path):
-    video = VideoFileClip(video_path)
-    audio = AudioFileClip(audio_path)
+# MP4 컨테이너에 그대로 담을 수 있는 비디오 코덱 (OpenCV FOURCC 소문자 기준)
+MP4_COPY_CODECS = {"avc1", "h264", "x264", "hev1", "hvc1", "hevc", "h265", "mp4v", "fmp4", "av01"}
 
-    if audio.duration > video.duration:
-        audio = audio.subclip(0, video.duration)
+def _ffmpeg_binary():
+    # moviepy가 사용하는 것과 같은 ffmpeg 바이너리 (imageio-ffmpeg 또는 FFMPEG_BINARY 설정)
+    from moviepy.config import get_setting
+    return get_setting("FFMPEG_BINARY")
 
-    video_with_audio = video.set_audio(audio)
-    video_with_audio.write_videofile(output_path, codec='libx264', audio_codec='aac')
+def _mux(video_path, audio_path, output_path, duration, copy_video):
+    cmd = [_ffmpeg_binary(), "-y", "-loglevel", "error", "-i", video_path, "-i", audio_path,
+           "-map", "0:v:0", "-map", "1:a:0"]
+    if copy_video:
+        cmd += ["-c:v", "copy"]
+    else:
+        cmd += ["-c:v", "libx264", "-preset", "veryfast", "-pix_fmt", "yuv420p"]
+    cmd += ["-c:a", "aac", "-b:a", "192k"]
+    # 음악이 영상보다 길면 영상 길이에 맞춰 자름
+    cmd += ["-t", f"{duration:.3f}"] if duration else ["-shortest"]
+    cmd += ["-movflags", "+faststart", output_path]
 
-    video.close()
-    audio.close()
+    subprocess.run(cmd, check=True, capture_output=True)
 
-def run_pipeline(video_path: str, output_dir: str) -> str:
+def combine_video_audio(video_path, audio_path, output_path, video_info=None):
+    """
+    원본 비디오 스트림은 그대로 복사하고 생성된 WAV만 AAC로 인코딩해 MP4로 합성한다.
+    원본 코덱을 MP4에 담을 수 없거나 복사에 실패한 경우에만 libx264로 재인코딩한다.
+    """
+    info = video_info
+    if info is None:
+        from logic.frame_extractor import FrameExtractor
+        info = FrameExtractor().probe(video_path)
+    codec = (info.get("codec") or "").lower()
+    duration = info.get("duration")
+
+    if not codec or codec in MP4_COPY_CODECS:
+        try:
+            _mux(video_path, audio_path, output_path, duration, copy_video=True)
+            print(f"[INFO] Muxed with video stream copy (codec: {codec or 'unknown'})")
+            return
+        except subprocess.CalledProcessError as e:
+            print(f"[WARNING] Stream copy failed, re-encoding: {e.stderr.decode(errors='ignore')[-500:]}")
+
+    try:
+        _mux(video_path, audio_path, output_path, duration, copy_video=False)
+    except subprocess.CalledProcessError as e:
+        raise RuntimeError(f"ffmpeg re-encode failed: {e.stderr.decode(errors='ignore')[-500:]}") from e
+    print(f"[INFO] Muxed with libx264 re-encode (codec: {codec or 'unknown'})")
+
+# 비디오 캡셔닝에 샘플링할 최대 프레임 수 (영상 길이와 관계없이 균등 간격, 0이면 1초 간격 전체 샘플링)
+MAX_FRAMES = int(os.getenv("AURA_MAX_FRAMES", "32"))
+
+# 진행 상황 보고용 단계 이름 (run_pipeline의 progress 콜백에 순서대로 전달됨)
+VIDEO_STAGES = ["caption", "refine_prompt", "generate_music", "save_music", "combine", "save_result"]
+
+def caption_video(video_path: str, registry=None):
+    """
+    프레임 추출 → 중복 제거 → BLIP 캡셔닝 다수결. (raw_caption, video_info) 반환
+    디코딩은 백그라운드 스레드에서, 프레임은 크기 제한 큐를 거쳐 배치 단위로 BLIP에 전달된다.
+    거의 동일한 연속 프레임은 캡셔닝 전에 제거하고 그 수만큼 다수결 가중치로 반영한다.
+    """
+    # OpenCV / torch는 캡셔닝이 실제로 필요할 때 가져온다
+    from logic.frame_extractor import FrameExtractor
+    from logic.blip_emotion_analyzer import BLIPEmotionAnalyzer
+    from logic.frame_deduplicator import FrameDeduplicator
+
+    extractor = FrameExtractor(max_frames=MAX_FRAMES or None)
+    deduplicator = FrameDeduplicator()
+    analyzer = BLIPEmotionAnalyzer(registry=registry or get_model_registry())
+    frames = extractor.stream_frames(video_path)
+    raw_caption = analyzer.analyze_weighted_frames(deduplicator.filter(frames))
+    return raw_caption, extractor.video_info
+
+def run_pipeline(video_path: str, output_dir: str, progress=None, result_path=None) -> str:
+    """
+    비디오 → 음악 → 합성 파이프라인. 결과 MP4는 result_path(기본: results/aura_video_*.mp4)에
+    한 번만 쓰이며, 같은 디렉토리의 임시 파일에 합성한 뒤 원자적으로 rename 한다.
+    """
     # 처리 파일 저장을 위한 임시 디렉토리 생성
     os.makedirs(output_dir, exist_ok=True)
     
@@ -34,39 +95,55 @@ def run_pipeline(video_path: str, output_dir: str) -> str:
     
     # 임시 처리 파일 경로
     music_path = os.path.join(output_dir, f"music_{filename_only}.wav")
-    temp_result_path = os.path.join(output_dir, f"result_{filename_only}.mp4")
     
-    # 영상 결과를 영구적으로 저장할 디렉토리 생성
-    final_result_path = os.path.join(results_dir, f"aura_video_{filename_only}_{timestamp}.mp4")
+    # 영상 결과를 영구적으로 저장할 경로 (합성 중에는 같은 디렉토리의 .part 파일에 기록)
+    final_result_path = result_path or os.path.join(results_dir, f"aura_video_{filename_only}_{timestamp}.mp4")
+    result_dir, result_name = os.path.split(final_result_path)
+    partial_result_path = os.path.join(result_dir, f".{result_name}.part.mp4")
 
-    # [1단계] 프레임 추출
-    extractor = FrameExtractor()
-    frames = extractor.extract_frames(video_path)
+    report = progress or (lambda stage: None)
+    # 추론 워커 풀이 켜져 있으면 캡셔닝/생성은 워커 프로세스에서 실행 (가중치는 공유)
+    pool = get_inference_pool()
 
-    # [2단계] 감성 문장 생성
-    analyzer = BLIPEmotionAnalyzer()
-    raw_caption = analyzer.analyze_frames(frames)
+    # [1~2단계] 프레임 추출 + 중복 제거 + 감성 문장 생성
+    report("caption")
+    if pool is not None:
+        raw_caption, video_info = pool.caption_video(video_path)
+    else:
+        raw_caption, video_info = caption_video(video_path)
 
     # [3단계] 프롬프트 정제
-    refiner = LLMPromptRefiner()
-    refined_prompt = refiner.refine_prompt(raw_caption)
+    report("refine_prompt")
+    try:
+        refiner = get_model_registry().get_refiner()
+        refined_prompt = refiner.refine_prompt(raw_caption)
+    except Exception as e:
+        # LLM이 느리거나(기한 초과) 실패해도 파이프라인은 캡션 기반 프롬프트로 계속 진행
+        print(f"[WARNING] Prompt refinement failed: {e}")
+        refined_prompt = f"Create music that captures the mood of: {raw_caption}"
 
-    # [4단계] 음악 생성
-    clip = VideoFileClip(video_path)
-    generator = MusicGenerator()
-    music = generator.generate_music(refined_prompt, clip.duration)
-    clip.close()
+    # [4단계] 음악 생성 (영상 길이는 프레임 추출 시 읽은 메타데이터 사용)
+    report("generate_music")
+    duration = video_info["duration"]
+    generator = pool or get_music_scheduler()
+    music = generator.generate_music(refined_prompt, duration)
 
     # [5단계] 음악 저장
+    report("save_music")
     sf.write(music_path, music['audio'], music['sampling_rate'], format='WAV', subtype='FLOAT')
 
     # [6단계] 비디오+음악 합성
-    combine_video_audio(video_path, music_path, temp_result_path)
-    
-    # [7단계] 영상 결과를 영구적으로 저장
-    import shutil
-    shutil.copy2(temp_result_path, final_result_path)
+    report("combine")
+    try:
+        combine_video_audio(video_path, music_path, partial_result_path, video_info)
+        
+        # [7단계] 영상 결과를 영구적으로 저장 (복사 없이 원자적 rename)
+        report("save_result")
+        os.replace(partial_result_path, final_result_path)
+    finally:
+        if os.path.exists(partial_result_path):
+            os.unlink(partial_result_path)
     print(f"영상 결과를 영구적으로 저장: {final_result_path}")
     
     # 반환
-    return temp_result_path, final_result_path
+    return final_result_path
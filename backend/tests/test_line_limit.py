@@ -0,0 +1,55 @@
+import random
+
+import pytest
+
+from logic.line_limit import LineLimiter, limit_lines
+
+ALPHABET = ["a", "b", "가", " ", "  ", "\t", "\n", "\n\n", " \n", "\r", "- ", "1. "]
+
+
+def stream(text, chunk_sizes):
+    limiter = LineLimiter()
+    out, start = [], 0
+    for size in chunk_sizes:
+        out.append(limiter.feed(text[start:start + size]))
+        start += size
+        if limiter.done:
+            break
+    return "".join(out)
+
+
+def random_chunks(rng, length):
+    sizes = []
+    while sum(sizes) < length:
+        sizes.append(rng.randint(1, 5))
+    return sizes
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "   \n\n  ",
+    "hello",
+    "  indented first\n  - item one\n    - nested\n  - item two\n",
+    "line1\n\n\nline2  \n   \nline3\t\nline4",
+    "trailing   ",
+    "a \nb \nc \nd",
+    "code:\n    def f():\n        return 1\n",
+])
+def test_stream_matches_limit_lines(text):
+    assert stream(text, [1] * len(text)) == limit_lines(text)
+    assert stream(text, [max(1, len(text))]) == limit_lines(text)
+
+
+def test_stream_matches_limit_lines_randomized():
+    rng = random.Random(0)
+    for _ in range(5000):
+        text = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 40)))
+        assert stream(text, random_chunks(rng, len(text))) == limit_lines(text), repr(text)
+
+
+def test_done_after_max_lines():
+    limiter = LineLimiter(max_lines=2)
+    assert limiter.feed("one\ntwo\n") == "one\ntwo"
+    assert not limiter.done
+    assert limiter.feed("three") == ""
+    assert limiter.done
@@ -147,11 +147,15 @@ export const uploadAudio = async (file: File) => {
  */
 interface ChatMessageRequest {
   message: string;
+  session_id?: string;
   image_url?: string;
   audio_url?: string;
   video_url?: string;
 }
 
+// Chat session id issued by the backend on the first message
+let chatSessionId: string | undefined;
+
 /**
  * Send a chat message to the LangChain-powered backend
  * @param messageData The message data including text and any media URLs
@@ -164,7 +168,7 @@ export const sendChatMessage = async (messageData: ChatMessageRequest) => {
       headers: {
         'Content-Type': 'application/json',
       },
-      body: JSON.stringify(messageData),
+      body: JSON.stringify({ session_id: chatSessionId, ...messageData }),
     });
 
     if (!response.ok) {
@@ -172,7 +176,12 @@ export const sendChatMessage = async (messageData: ChatMessageRequest) => {
       throw new Error(errorData.detail || 'Failed to process chat message');
     }
 
-    return await response.json();
+    const data = await response.json();
+    // Keep the server-issued session id so follow-up messages share the same conversation memory
+    if (data.session_id) {
+      chatSessionId = data.session_id;
+    }
+    return data;
   } catch (error) {
     console.error('Error sending chat message:', error);
     throw error;